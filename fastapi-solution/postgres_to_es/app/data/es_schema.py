@@ -74,6 +74,12 @@ SCHEMA_MOVIES = {
                     "name": {"type": "text", "analyzer": "ru_en"},
                 },
             },
+            # Плоские копии id для фильтров без nested-запросов
+            "genre_ids": {"type": "keyword"},
+            "actor_ids": {"type": "keyword"},
+            "writer_ids": {"type": "keyword"},
+            "director_ids": {"type": "keyword"},
+            "person_ids": {"type": "keyword"},
         },
     },
 }
@@ -113,6 +119,9 @@ SCHEMA_GENRES = {
             "id": {"type": "keyword"},
             "name": {"type": "text", "analyzer": "ru_en"},
             "description": {"type": "text", "analyzer": "ru_en"},
+            "film_count": {"type": "integer"},
+            "avg_rating": {"type": "float"},
+            "top_film_ids": {"type": "keyword"},
         },
     },
 }
@@ -152,9 +161,21 @@ SCHEMA_PERSONS = {
         "properties": {
             "id": {"type": "keyword"},
             "full_name": {"type": "text", "analyzer": "ru_en"},
+            "films": {
+                "type": "object",
+                "dynamic": "strict",
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "roles": {"type": "keyword"},
+                },
+            },
         },
     },
 }
 
 
 SCHEMAS = [SCHEMA_MOVIES, SCHEMA_GENRES, SCHEMA_PERSONS]
+
+# Версия схемы индекса: после ее повышения загрузчик соберет индекс
+# {name}_v{version} заново и переключит на него псевдоним
+SCHEMA_VERSIONS = {"movies": 2, "genres": 2, "persons": 2}
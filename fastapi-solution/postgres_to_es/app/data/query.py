@@ -1,4 +1,4 @@
-MOVIES_QUERY = """
+FILMS_BY_IDS_QUERY = """
 SELECT
 fw.id,
 fw.title,
@@ -43,41 +43,149 @@ COALESCE (
         )
     ) FILTER (WHERE pfw.role = 'writer'),
     '[]'
-) as writers
+) as writers,
+COALESCE (array_agg(DISTINCT g.id::text) FILTER (WHERE g.id IS NOT NULL), '{}') AS genre_ids,
+COALESCE (array_agg(DISTINCT p.id::text) FILTER (WHERE pfw.role = 'actor'), '{}') AS actor_ids,
+COALESCE (array_agg(DISTINCT p.id::text) FILTER (WHERE pfw.role = 'writer'), '{}') AS writer_ids,
+COALESCE (array_agg(DISTINCT p.id::text) FILTER (WHERE pfw.role = 'director'), '{}') AS director_ids,
+COALESCE (array_agg(DISTINCT p.id::text) FILTER (WHERE p.id IS NOT NULL), '{}') AS person_ids,
+(EXTRACT(EPOCH FROM statement_timestamp()) * 1000000)::bigint AS version
 FROM content.film_work fw
 LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
 LEFT JOIN content.person p ON p.id = pfw.person_id
 LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
 LEFT JOIN content.genre g ON g.id = gfw.genre_id
-WHERE fw.modified > '{date:}' OR p.modified > '{date:}' OR g.modified > '{date:}'
-GROUP BY fw.id
-ORDER BY fw.modified;
+WHERE fw.id = ANY(%s::uuid[])
+GROUP BY fw.id;
 """
 
-GENRES_QUERY = """
+GENRES_BY_IDS_QUERY = """
 SELECT
     g.id,
     g.name,
-    g.description
+    g.description,
+    stats.film_count,
+    stats.avg_rating,
+    COALESCE (top.film_ids, '{}') as top_film_ids,
+    (EXTRACT(EPOCH FROM statement_timestamp()) * 1000000)::bigint AS version
 FROM
     content.genre g
-WHERE g.modified > '{date:}'
-GROUP BY
-    g.id
-ORDER BY
-    g.modified;
-
+CROSS JOIN LATERAL (
+    SELECT
+        count(*) as film_count,
+        avg(fw.rating) as avg_rating
+    FROM
+        content.genre_film_work gfw
+    JOIN content.film_work fw ON fw.id = gfw.film_work_id
+    WHERE gfw.genre_id = g.id
+) stats
+CROSS JOIN LATERAL (
+    SELECT
+        array_agg(t.id::text ORDER BY t.rating DESC NULLS LAST, t.id) as film_ids
+    FROM (
+        SELECT
+            fw.id,
+            fw.rating
+        FROM
+            content.genre_film_work gfw
+        JOIN content.film_work fw ON fw.id = gfw.film_work_id
+        WHERE gfw.genre_id = g.id
+        ORDER BY
+            fw.rating DESC NULLS LAST,
+            fw.id
+        LIMIT 10
+    ) t
+) top
+WHERE g.id = ANY(%s::uuid[]);
 """
 
-PERSONS_QUERY = """
+PERSONS_BY_IDS_QUERY = """
 SELECT
     p.id,
-    p.full_name as name
+    p.full_name as name,
+    COALESCE (
+        json_agg(
+            json_build_object('id', pf.film_work_id, 'roles', pf.roles)
+            ORDER BY pf.rating DESC NULLS LAST, pf.film_work_id
+        ) FILTER (WHERE pf.film_work_id IS NOT NULL),
+        '[]'
+    ) as films,
+    (EXTRACT(EPOCH FROM statement_timestamp()) * 1000000)::bigint AS version
 FROM
     content.person p
-WHERE p.modified > '{date:}'
-GROUP BY 
-    p.id
-ORDER BY 
-    p.modified;
+LEFT JOIN LATERAL (
+    SELECT
+        pfw.film_work_id,
+        fw.rating,
+        array_agg(
+            pfw.role ORDER BY array_position(ARRAY['actor', 'writer', 'director'], pfw.role)
+        ) as roles
+    FROM
+        content.person_film_work pfw
+    JOIN content.film_work fw ON fw.id = pfw.film_work_id
+    WHERE pfw.person_id = p.id
+    GROUP BY
+        pfw.film_work_id,
+        fw.rating
+) pf ON TRUE
+WHERE p.id = ANY(%s::uuid[])
+GROUP BY
+    p.id;
+"""
+
+CHANGED_IDS_QUERY = """
+SELECT
+    id,
+    modified
+FROM
+    content.{table}
+WHERE (modified, id) > (%s, %s::uuid)
+ORDER BY
+    modified,
+    id
+LIMIT %s;
+"""
+
+FILM_IDS_BY_PERSONS_QUERY = """
+SELECT DISTINCT
+    pfw.film_work_id AS id
+FROM
+    content.person_film_work pfw
+WHERE pfw.person_id = ANY(%s::uuid[]) AND pfw.film_work_id > %s::uuid
+ORDER BY
+    pfw.film_work_id
+LIMIT %s;
+"""
+
+FILM_IDS_BY_GENRES_QUERY = """
+SELECT DISTINCT
+    gfw.film_work_id AS id
+FROM
+    content.genre_film_work gfw
+WHERE gfw.genre_id = ANY(%s::uuid[]) AND gfw.film_work_id > %s::uuid
+ORDER BY
+    gfw.film_work_id
+LIMIT %s;
+"""
+
+PERSON_IDS_BY_FILMS_QUERY = """
+SELECT DISTINCT
+    pfw.person_id AS id
+FROM
+    content.person_film_work pfw
+WHERE pfw.film_work_id = ANY(%s::uuid[]) AND pfw.person_id > %s::uuid
+ORDER BY
+    pfw.person_id
+LIMIT %s;
+"""
+
+GENRE_IDS_BY_FILMS_QUERY = """
+SELECT DISTINCT
+    gfw.genre_id AS id
+FROM
+    content.genre_film_work gfw
+WHERE gfw.film_work_id = ANY(%s::uuid[]) AND gfw.genre_id > %s::uuid
+ORDER BY
+    gfw.genre_id
+LIMIT %s;
 """
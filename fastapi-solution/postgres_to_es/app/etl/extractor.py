@@ -4,21 +4,51 @@ import backoff
 
 from psycopg2.extensions import connection as _connection
 from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterator
 
+from etl.pipeline import MIN_UUID, Enricher, Merger, Producer
 from etl.validation import FilmWork, Genre, Person_Vld
-from data.query import MOVIES_QUERY, GENRES_QUERY, PERSONS_QUERY
+from data.query import FILMS_BY_IDS_QUERY, GENRES_BY_IDS_QUERY, PERSONS_BY_IDS_QUERY
 from settings import settings
+from state.state import State
 
 
 MAX_TRIES = settings.max_tries
 MAX_TIME = settings.max_time
+SOURCE_TABLES = ("film_work", "person", "genre")
+INDEX_TABLES = {"movies": "film_work", "persons": "person", "genres": "genre"}
+TABLE_INDEXES = {
+    "film_work": ("movies", FILMS_BY_IDS_QUERY, FilmWork),
+    "person": ("persons", PERSONS_BY_IDS_QUERY, Person_Vld),
+    "genre": ("genres", GENRES_BY_IDS_QUERY, Genre),
+}
+INDEX_QUERIES = {
+    index: (query, ValidatorClass)
+    for index, query, ValidatorClass in TABLE_INDEXES.values()
+}
+# Индекс, документы и checkpoint, который сдвигается после их загрузки
+Batch = tuple[str, list[dict], Callable[[], None] | None]
 
 
 class PostgresExtractor:
 
-    def __init__(self, dsl: dict, batch_size: int) -> None:
+    def __init__(
+        self,
+        dsl: dict,
+        batch_size: int,
+        state: State,
+        itersize: int = 1000,
+        tables: tuple[str, ...] = SOURCE_TABLES,
+        enrich: bool = True,
+    ) -> None:
         self.batch_size = batch_size
         self.dsl = dsl
+        self.tables = tables
+        self.enrich = enrich
+        self.producer = Producer(state, batch_size, itersize)
+        self.enricher = Enricher(state, batch_size, itersize)
+        self.merger = Merger(batch_size, itersize)
 
     @contextmanager
     def conn_context_pg(self, dsl: str) -> _connection:
@@ -40,32 +70,120 @@ class PostgresExtractor:
         finally:
             conn.close()
 
-    @backoff.on_exception(
-        backoff.expo, psycopg2.OperationalError, max_tries=MAX_TRIES, max_time=MAX_TIME
-    )
-    def extract_data(self, state_datetime: str) -> dict:
-        """Извлекает данные из Postgres."""
+    def extract_data(self) -> Iterator[Batch]:
+        """Отдает из Postgres пачки документов по накопленным изменениям.
+
+        По каждой таблице производитель отдает id измененных записей,
+        обогатитель находит затронутые фильмы, а сборщик строит документы
+        только для них. Чтение может уйти вперед загрузки, поэтому
+        состояние не пишется по ходу: пачка несет checkpoint, который
+        загрузчик применяет после записи в ES всех документов до нее.
+        """
         with self.conn_context_pg(self.dsl) as connection:
-            with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                queries = {
-                    "movies": (MOVIES_QUERY.format(date=state_datetime), FilmWork),
-                    "genres": (GENRES_QUERY.format(date=state_datetime), Genre),
-                    "persons": (PERSONS_QUERY.format(date=state_datetime), Person_Vld),
-                }
-
-                loaded_data = {key: [] for key in queries.keys()}
-
-                for key, (query, ValidatorClass) in queries.items():
-                    cursor.execute(query)
-                    while True:
-                        data = cursor.fetchmany(self.batch_size)
-                        if data:
-                            for one_batch in data:
-                                loaded_data[key].append(
-                                    ValidatorClass(**dict(one_batch)).model_dump(
-                                        mode="json"
-                                    )
-                                )
-                        else:
-                            break
-        return loaded_data
+            for table in self.tables:
+                yield from self._extract_table(connection, table)
+
+    def _extract_table(self, connection: _connection, table: str) -> Iterator[Batch]:
+        index, query, ValidatorClass = TABLE_INDEXES[table]
+        # Прогресс из состояния верен только для пачки, прерванной в прошлый раз
+        ids = self.enricher.pending(table)
+        progress = {
+            related: self.enricher.progress(table, related)
+            for related in self.enricher.queries.get(table, ())
+        }
+        watermark = self.producer.checkpoint(table)
+        deferred = {
+            related: set(self.enricher.deferred_ids(table, related))
+            for related in self.enricher.deferred.get(table, ())
+        }
+        while True:
+            if ids is None:
+                ids, watermark = self.producer.produce(connection, table, watermark)
+                if not ids:
+                    if self.enrich:
+                        yield from self._extract_deferred(connection, table, deferred)
+                    return
+                yield index, [], partial(self._accept, table, ids, watermark)
+                progress = {}
+            for docs in self.merger.merge(connection, query, ValidatorClass, ids):
+                yield index, docs, None
+            if self.enrich:
+                yield from self._extract_related(
+                    connection, table, ids, progress, deferred
+                )
+            yield index, [], partial(self.enricher.commit, table)
+            ids = None
+            # Не держим транзакцию открытой между пачками производителя
+            connection.commit()
+
+    def _accept(self, table: str, ids: list[str], watermark: dict) -> None:
+        """Передает пачку обогатителю и сдвигает водяной знак производителя."""
+        self.enricher.accept(table, ids)
+        self.producer.commit(table, watermark)
+
+    def extract_ids(self, table: str, ids: list[str]) -> Iterator[Batch]:
+        """Отдает документы по id из уведомлений Postgres.
+
+        Водяные знаки не сдвигаются: пропущенные уведомления подберет
+        обычное сканирование.
+        """
+        with self.conn_context_pg(self.dsl) as connection:
+            index, query, ValidatorClass = TABLE_INDEXES[table]
+            for docs in self.merger.merge(connection, query, ValidatorClass, ids):
+                yield index, docs, None
+            if self.enrich:
+                yield from self._extract_related(connection, table, ids)
+
+    def _extract_related(
+        self,
+        connection: _connection,
+        table: str,
+        ids: list[str],
+        progress: dict | None = None,
+        deferred: dict | None = None,
+    ) -> Iterator[Batch]:
+        """Документы других индексов, затронутые изменением записей таблицы.
+
+        С progress пачки несут checkpoint последнего зависящего документа,
+        без него прогресс не отслеживается. Id индексов из deferred только
+        копятся, их документы собирает _extract_deferred.
+        """
+        for index in self.enricher.queries.get(table, ()):
+            if deferred is not None and index in deferred:
+                related_ids = [
+                    related_id
+                    for page in self.enricher.enrich(connection, table, index, ids)
+                    for related_id in page
+                ]
+                deferred[index].update(related_ids)
+                yield index, [], partial(self.enricher.defer, table, index, related_ids)
+                continue
+            query, ValidatorClass = INDEX_QUERIES[index]
+            last_id = progress.get(index, MIN_UUID) if progress else MIN_UUID
+            for related_ids in self.enricher.enrich(
+                connection, table, index, ids, last_id
+            ):
+                for docs in self.merger.merge(
+                    connection, query, ValidatorClass, related_ids
+                ):
+                    yield index, docs, None
+                if progress is not None:
+                    advance = partial(
+                        self.enricher.advance, table, index, related_ids[-1]
+                    )
+                    yield index, [], advance
+
+    def _extract_deferred(
+        self, connection: _connection, table: str, deferred: dict
+    ) -> Iterator[Batch]:
+        """Документы, отложенные до конца потока таблицы, одним проходом."""
+        for index, ids in deferred.items():
+            if not ids:
+                continue
+            query, ValidatorClass = INDEX_QUERIES[index]
+            for docs in self.merger.merge(
+                connection, query, ValidatorClass, sorted(ids)
+            ):
+                yield index, docs, None
+            yield index, [], partial(self.enricher.release, table, index)
+        connection.commit()
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import backoff
+import redis
+
+from settings import settings
+
+
+MAX_TRIES = settings.max_tries
+MAX_TIME = settings.max_time
+KEY_PREFIX = "etl:hashes:"
+
+
+class ContentHashStore:
+    """Хранит хеши загруженных документов, чтобы не переиндексировать неизменные.
+
+    Хеши индекса лежат в одном хеше Redis: id документа -> 16 байт blake2b.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.client = redis.Redis(host=host, port=port)
+
+    @staticmethod
+    def doc_hash(doc: dict) -> bytes:
+        data = json.dumps(
+            doc, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def changed(self, index: str, docs: list) -> tuple[list, dict]:
+        """Документы, чей хеш отличается от загруженного, и их новые хеши."""
+        if not docs:
+            return [], {}
+        hashes = [self.doc_hash(doc) for doc in docs]
+        stored = self.client.hmget(KEY_PREFIX + index, [doc["id"] for doc in docs])
+        changed = [
+            (doc, new) for doc, new, old in zip(docs, hashes, stored) if new != old
+        ]
+        return [doc for doc, _ in changed], {doc["id"]: new for doc, new in changed}
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def save(self, index: str, hashes: dict) -> None:
+        """Запоминает хеши документов, загрузку которых подтвердил ES."""
+        if hashes:
+            self.client.hset(KEY_PREFIX + index, mapping=hashes)
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def clear(self, index: str) -> None:
+        """Забывает хеши индекса, например после его пересоздания."""
+        self.client.delete(KEY_PREFIX + index)
+
+    def close(self) -> None:
+        """Закрывает соединение с Redis."""
+        self.client.close()
@@ -0,0 +1,69 @@
+import json
+import select
+import time
+import backoff
+import psycopg2
+
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from typing import Iterator
+
+from settings import settings
+
+
+MAX_TRIES = settings.max_tries
+MAX_TIME = settings.max_time
+# Канал, в который пишут триггеры из movies_database.sql
+CHANNEL = "etl_changes"
+
+
+class PostgresListener:
+    """Ждет уведомлений триггеров об измененных записях (LISTEN/NOTIFY)."""
+
+    def __init__(self, dsl: dict, debounce: float, max_delay: float) -> None:
+        self.dsl = dsl
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.connection = None
+
+    @backoff.on_exception(
+        backoff.expo, psycopg2.OperationalError, max_tries=MAX_TRIES, max_time=MAX_TIME
+    )
+    def __enter__(self) -> "PostgresListener":
+        # keepalive, чтобы обрыв соединения не повесил ожидание навсегда
+        self.connection = psycopg2.connect(
+            **self.dsl, keepalives=1, keepalives_idle=30, keepalives_interval=10
+        )
+        self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL};")
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.connection.close()
+
+    def changes(self) -> Iterator[dict[str, list[str]]]:
+        """Отдает id измененных записей по таблицам.
+
+        После первого уведомления ждет, пока поток уведомлений затихнет на
+        debounce секунд, но не дольше max_delay, и отдает накопленное разом.
+        """
+        while True:
+            changes = {}
+            self._wait(None)
+            self._drain(changes)
+            started = time.monotonic()
+            while time.monotonic() - started < self.max_delay:
+                if not self._wait(self.debounce):
+                    break
+                self._drain(changes)
+            yield {table: list(ids) for table, ids in changes.items()}
+
+    def _wait(self, timeout: float | None) -> bool:
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        return bool(readable)
+
+    def _drain(self, changes: dict) -> None:
+        self.connection.poll()
+        while self.connection.notifies:
+            payload = json.loads(self.connection.notifies.pop(0).payload)
+            changes.setdefault(payload["table"], set()).add(payload["id"])
@@ -1,25 +1,78 @@
 import os
+import re
+import threading
 import elastic_transport
 import backoff
 
-from elasticsearch import Elasticsearch, helpers
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
 
-from data.es_schema import SCHEMAS
+from elasticsearch import BadRequestError, Elasticsearch, NotFoundError, helpers
+from loguru import logger
+
+from data.es_schema import SCHEMAS, SCHEMA_VERSIONS
+from etl.hashes import ContentHashStore
+from etl.notifier import RedisNotifier
+from etl.pipeline import VERSION_FIELD
 from settings import settings
 
 
 MAX_TRIES = settings.max_tries
 MAX_TIME = settings.max_time
+INITIAL_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+
+class LoadingBatch:
+    """Пачка, документы которой отданы bulk-хелперу, но еще не загружены."""
+
+    def __init__(
+        self,
+        key: str,
+        docs: list,
+        hashes: dict,
+        versions: dict,
+        on_loaded: Callable[[], None] | None,
+    ) -> None:
+        self.key = key
+        self.docs = docs
+        self.hashes = hashes
+        self.versions = versions
+        self.on_loaded = on_loaded
+        self.remaining = len(docs)
+        self.errors = []
 
 
 class ElasticsearchLoader:
 
-    def __init__(self, dsl: dict, index_name: str) -> None:
+    def __init__(
+        self,
+        dsl: dict,
+        index_name: str,
+        notifier: RedisNotifier | None = None,
+        targets: dict | None = None,
+        hash_store: ContentHashStore | None = None,
+    ) -> None:
         self.index_name = index_name
         self.dsl = dsl
+        self.notifier = notifier
+        # Псевдоним -> версия индекса, в которую пишет пересборка
+        self.targets = targets or {}
+        self.hash_store = hash_store
+        self.skipped_count = 0
+        self.loaded_count = 0
+        self.failed_count = 0
+        self.rebuilds = {}
         self.es_client = None
         self.get_client()
         self.make_index()
+        # В режиме начальной загрузки индекс не обновляется до ее конца,
+        # страницы API сбросит finish_initial_load
+        self.deferred_notify = {
+            name
+            for name in self.index_name
+            if self.in_initial_load(self.targets.get(name, name))
+        }
 
     @backoff.on_exception(
         backoff.expo,
@@ -38,10 +91,41 @@ class ElasticsearchLoader:
         max_time=MAX_TIME,
     )
     def make_index(self) -> None:
-        """Создает индекс в ES."""
-        for ind_name, schema in zip(self.index_name, SCHEMAS):
-            if not self.es_client.indices.exists(index=ind_name):
-                self.es_client.indices.create(index=ind_name, body=schema)
+        """Создает версии индексов и псевдонимы, по которым читает API.
+
+        Если псевдоним указывает на старую версию или занят индексом без
+        версии, новая версия создается пустой и попадает в rebuilds.
+        """
+        for name, schema in zip(self.index_name, SCHEMAS):
+            index = f"{name}_v{SCHEMA_VERSIONS[name]}"
+            current = self.get_alias_index(name)
+            if current == index:
+                continue
+            self.create_index(index, schema)
+            if current is None and not self.es_client.indices.exists(index=name):
+                self.es_client.indices.update_aliases(
+                    actions=[{"add": {"index": index, "alias": name}}]
+                )
+            else:
+                self.rebuilds[name] = index
+
+    def create_index(self, index: str, schema: dict) -> None:
+        if self.es_client.indices.exists(index=index):
+            return
+        try:
+            self.es_client.indices.create(index=index, body=schema)
+        except BadRequestError as error:
+            # Индекс мог успеть создать загрузчик соседнего потока
+            if error.error != "resource_already_exists_exception":
+                raise
+
+    def get_alias_index(self, name: str) -> str | None:
+        """Индекс, на который указывает псевдоним."""
+        try:
+            response = self.es_client.indices.get_alias(name=name)
+        except NotFoundError:
+            return None
+        return next(iter(response))
 
     @backoff.on_exception(
         backoff.expo,
@@ -49,14 +133,119 @@ class ElasticsearchLoader:
         max_tries=MAX_TRIES,
         max_time=MAX_TIME,
     )
-    def make_load(self, key: str, body_dt: list) -> tuple:
-        """Загружает данные в ES."""
-        actions = [
-            {"_index": key, "_id": one_batch["id"], "_source": one_batch}
-            for one_batch in body_dt
+    def swap_alias(self, name: str, index: str) -> None:
+        """Атомарно переводит псевдоним на новую версию и удаляет старую."""
+        old_index = self.get_alias_index(name) or name
+        self.es_client.indices.update_aliases(
+            actions=[
+                {"remove_index": {"index": old_index}},
+                {"add": {"index": index, "alias": name}},
+            ]
+        )
+
+    def in_initial_load(self, index: str) -> bool:
+        response = self.es_client.indices.get_settings(index=index)
+        index_settings = next(iter(response.values()))["settings"]["index"]
+        return index_settings.get("refresh_interval") == "-1"
+
+    def restore_interrupted_initial_load(self) -> None:
+        """Восстанавливает настройки, если прошлый запуск оборвался при загрузке."""
+        for index in self.index_name:
+            if self.in_initial_load(index):
+                self.finish_initial_load(index)
+
+    def schema_settings(self, index: str) -> dict:
+        """Настройки индекса из схемы, которые меняет начальная загрузка."""
+        name = re.sub(r"_v\d+$", "", index)
+        schema = dict(zip(self.index_name, SCHEMAS))[name]["settings"]
+        # None возвращает настройке значение ES по умолчанию
+        return {key: schema.get(key) for key in INITIAL_LOAD_SETTINGS}
+
+    @contextmanager
+    def initial_load(self) -> Iterator[list[str]]:
+        """Режим начальной загрузки для пустых индексов.
+
+        Пока идет загрузка, обновление сегментов и реплики отключены,
+        после нее настройки восстанавливаются и индекс обновляется.
+        """
+        indexes = [
+            index
+            for index in self.index_name
+            if self.es_client.count(index=index)["count"] == 0
         ]
-        res = helpers.bulk(self.es_client, actions)
-        return res
+        for index in indexes:
+            self.start_initial_load(index)
+        try:
+            yield indexes
+        finally:
+            for index in indexes:
+                self.finish_initial_load(index)
+
+    @backoff.on_exception(
+        backoff.expo,
+        (elastic_transport.ConnectionTimeout, elastic_transport.ConnectionError),
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def start_initial_load(self, index: str) -> None:
+        logger.info(f"{index}: начальная загрузка")
+        self.es_client.indices.put_settings(
+            index=index, settings={"index": INITIAL_LOAD_SETTINGS}
+        )
+
+    @backoff.on_exception(
+        backoff.expo,
+        (elastic_transport.ConnectionTimeout, elastic_transport.ConnectionError),
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def finish_initial_load(self, index: str) -> None:
+        """Восстанавливает настройки из схемы и делает индекс видимым поиску."""
+        self.es_client.indices.put_settings(
+            index=index, settings={"index": self.schema_settings(index)}
+        )
+        self.es_client.indices.refresh(index=index)
+        if settings.es_forcemerge_after_initial_load:
+            self.es_client.indices.forcemerge(index=index, max_num_segments=1)
+        # Пока индекс не обновлялся, API мог закешировать пустые страницы.
+        # Версию индекса сбросит пересборка после переключения псевдонима
+        if self.notifier and index in self.index_name:
+            self.notifier.reset(index)
+        logger.info(f"{index}: начальная загрузка завершена")
+
+    def bulk(self, actions: Iterator[dict]) -> Iterator[tuple[bool, dict]]:
+        """Результаты bulk-хелпера в порядке действий.
+
+        Действия режутся на чанки по числу документов и размеру. Ошибки
+        отдельных документов возвращаются в результатах и не прерывают
+        загрузку остальных.
+        """
+        if settings.bulk_thread_count > 1:
+            return helpers.parallel_bulk(
+                self.es_client,
+                actions,
+                thread_count=settings.bulk_thread_count,
+                chunk_size=settings.bulk_chunk_size,
+                max_chunk_bytes=settings.bulk_max_chunk_bytes,
+                raise_on_error=False,
+            )
+        return helpers.streaming_bulk(
+            self.es_client,
+            actions,
+            chunk_size=settings.bulk_chunk_size,
+            max_chunk_bytes=settings.bulk_max_chunk_bytes,
+            raise_on_error=False,
+        )
+
+    @backoff.on_exception(
+        backoff.expo,
+        (elastic_transport.ConnectionTimeout, elastic_transport.ConnectionError),
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def refresh(self, key: str) -> None:
+        """Делает загруженные документы видимыми поиску."""
+        self.es_client.indices.refresh(index=self.targets.get(key, key))
 
     def close_connection(self) -> None:
         """Закрывает соединение с ES."""
@@ -64,8 +253,97 @@ class ElasticsearchLoader:
             self.es_client.close()
         self.es_client = None
 
-    def load_data(self, key: str, body_dt: list) -> tuple:
-        """Загружает данные в ES с восстановлением соединения."""
+    def load_batches(
+        self, batches: Iterable[tuple[str, list, Callable[[], None] | None]]
+    ) -> None:
+        """Загружает поток пачек в ES одним bulk-хелпером.
+
+        Чанки набираются из документов подряд идущих пачек, а пул потоков
+        один на весь поток. Результаты приходят в порядке документов, и
+        пачка считается загруженной, когда загружено все до ее конца: тогда
+        сохраняются ее хеши, сбрасывается кеш API и сдвигается ее checkpoint.
+        Соединение с ES не восстанавливается посреди потока, оборванную
+        загрузку продолжит следующий цикл с последнего checkpoint-а.
+        """
         if not self.es_client:
             self.get_client()
-        return self.make_load(key, body_dt)
+        loading = deque()
+        stopped = threading.Event()
+
+        def actions() -> Iterator[dict]:
+            # parallel_bulk читает действия в своем потоке
+            for key, docs, on_loaded in batches:
+                if stopped.is_set():
+                    return
+                batch = self.start_batch(key, docs, on_loaded)
+                loading.append(batch)
+                for doc in batch.docs:
+                    action = {
+                        "_index": self.targets.get(key, key),
+                        "_id": doc["id"],
+                        "_source": doc,
+                    }
+                    if doc["id"] in batch.versions:
+                        action["_version"] = batch.versions[doc["id"]]
+                        action["_version_type"] = "external"
+                    yield action
+
+        try:
+            for ok, item in self.bulk(actions()):
+                self.finish_loaded(loading)
+                batch = loading[0]
+                batch.remaining -= 1
+                if ok:
+                    self.loaded_count += 1
+                elif self.is_superseded(item):
+                    # В ES уже лежит сборка документа по более свежему снимку
+                    batch.errors.append(item)
+                    self.skipped_count += 1
+                else:
+                    logger.warning(f"Документ не загружен в {batch.key}: {item}")
+                    batch.errors.append(item)
+                    self.failed_count += 1
+                self.finish_loaded(loading)
+            self.finish_loaded(loading)
+        finally:
+            stopped.set()
+
+    def start_batch(
+        self, key: str, docs: list, on_loaded: Callable[[], None] | None
+    ) -> LoadingBatch:
+        """Отбрасывает неизменные документы пачки перед отправкой в ES.
+
+        Версия снимается с документа до подсчета хеша: она своя у каждой
+        сборки и в индекс не пишется.
+        """
+        versions = {
+            doc["id"]: doc.pop(VERSION_FIELD) for doc in docs if VERSION_FIELD in doc
+        }
+        hashes = {}
+        if self.hash_store and docs:
+            changed, hashes = self.hash_store.changed(key, docs)
+            self.skipped_count += len(docs) - len(changed)
+            docs = changed
+        return LoadingBatch(key, docs, hashes, versions, on_loaded)
+
+    @staticmethod
+    def is_superseded(item: dict) -> bool:
+        """Документ отклонен, потому что в ES его версия новее."""
+        result = next(iter(item.values()))
+        return result.get("status") == 409
+
+    def finish_loaded(self, loading: deque) -> None:
+        """Завершает пачки в начале очереди, все документы которых загружены."""
+        while loading and loading[0].remaining == 0:
+            batch = loading.popleft()
+            if self.hash_store:
+                for item in batch.errors:
+                    batch.hashes.pop(next(iter(item.values()))["_id"], None)
+                self.hash_store.save(batch.key, batch.hashes)
+            if self.notifier and batch.docs and batch.key not in self.deferred_notify:
+                # Сброс кеша до обновления индекса позволил бы API закешировать
+                # старую страницу еще на весь ее TTL
+                self.refresh(batch.key)
+                self.notifier.notify(batch.key, batch.docs)
+            if batch.on_loaded:
+                batch.on_loaded()
@@ -0,0 +1,102 @@
+import json
+import backoff
+import redis
+
+from settings import settings
+
+
+MAX_TRIES = settings.max_tries
+MAX_TIME = settings.max_time
+IDS_PER_MESSAGE = 1000
+FILM_PERSON_FIELDS = ("actors", "writers", "directors")
+# Множество ключей страниц API, зависящих от индекса
+PAGES_KEY_PREFIX = "pages:"
+
+
+class RedisNotifier:
+    """Сбрасывает кеш API по переиндексированным документам.
+
+    Ключи в Redis удаляются здесь же: pub/sub теряет события, на которые
+    в момент публикации не подписан ни один воркер API. Событие в канале
+    нужно только для сброса кешей в памяти воркеров.
+    """
+
+    def __init__(self, host: str, port: int, channel: str) -> None:
+        self.channel = channel
+        self.client = redis.Redis(host=host, port=port)
+
+    def notify(self, index: str, docs: list) -> None:
+        """Сбрасывает загруженные документы и зависящие от них индексы."""
+        for key, ids in self.related_ids(index, docs).items():
+            # Воркер, сбросивший локальный кеш, не должен перечитать старый ключ
+            self.evict(key, ids)
+            self.publish(key, ids)
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def evict(self, index: str, ids: list) -> None:
+        """Удаляет из Redis документы индекса и все страницы, зависящие от него."""
+        pages_key = PAGES_KEY_PREFIX + index
+        pages = self.client.smembers(pages_key)
+        pipe = self.client.pipeline(transaction=False)
+        for start in range(0, len(ids), IDS_PER_MESSAGE):
+            pipe.delete(*(f"{index}:{i}" for i in ids[start : start + IDS_PER_MESSAGE]))
+        if pages:
+            # Удаляем из множества только прочитанные страницы: добавленные
+            # после SMEMBERS должны дождаться следующего сброса
+            pipe.delete(*pages)
+            pipe.srem(pages_key, *pages)
+        pipe.execute()
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def publish(self, index: str, ids: list) -> None:
+        """Публикует id для воркеров API частями, без огромных сообщений."""
+        for start in range(0, len(ids), IDS_PER_MESSAGE):
+            message = {"index": index, "ids": ids[start : start + IDS_PER_MESSAGE]}
+            self.client.publish(self.channel, json.dumps(message))
+
+    @backoff.on_exception(
+        backoff.expo,
+        redis.exceptions.ConnectionError,
+        max_tries=MAX_TRIES,
+        max_time=MAX_TIME,
+    )
+    def reset(self, index: str) -> None:
+        """Сбрасывает весь кеш индекса после его пересборки.
+
+        Документы в кеше построены по старой версии индекса, поэтому
+        удаляются все ключи индекса, а не только страницы.
+        """
+        keys = list(self.client.scan_iter(match=f"{index}:*", count=IDS_PER_MESSAGE))
+        for start in range(0, len(keys), IDS_PER_MESSAGE):
+            self.client.delete(*keys[start : start + IDS_PER_MESSAGE])
+        self.evict(index, [])
+        message = {"index": index, "ids": [], "reset": True}
+        self.client.publish(self.channel, json.dumps(message))
+
+    @staticmethod
+    def related_ids(index: str, docs: list) -> dict:
+        """Собирает id по индексам: кеш персоны хранит ее фильмы."""
+        result = {index: [doc["id"] for doc in docs]}
+        if index == "movies":
+            person_ids = {
+                person["id"]
+                for doc in docs
+                for field in FILM_PERSON_FIELDS
+                for person in doc.get(field, [])
+            }
+            result["persons"] = list(person_ids)
+        return result
+
+    def close(self) -> None:
+        """Закрывает соединение с Redis."""
+        self.client.close()
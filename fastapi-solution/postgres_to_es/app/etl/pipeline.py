@@ -0,0 +1,198 @@
+import datetime
+import uuid
+
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterator
+
+from psycopg2.extensions import connection as _connection, cursor as _cursor
+from pydantic import BaseModel
+
+from data.query import (
+    CHANGED_IDS_QUERY,
+    FILM_IDS_BY_GENRES_QUERY,
+    FILM_IDS_BY_PERSONS_QUERY,
+    GENRE_IDS_BY_FILMS_QUERY,
+    PERSON_IDS_BY_FILMS_QUERY,
+)
+from state.state import State
+
+
+MIN_DATETIME = datetime.datetime.min.isoformat()
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+# Служебное поле документа с внешней версией для ES, в индекс не попадает
+VERSION_FIELD = "_version"
+
+
+@contextmanager
+def server_cursor(connection: _connection, itersize: int) -> Iterator[_cursor]:
+    """Именованный курсор: результат остается на сервере и читается порциями."""
+    cursor = connection.cursor(name=f"etl_{uuid.uuid4().hex}")
+    cursor.itersize = itersize
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+class Producer:
+    """Находит id измененных записей таблицы по диапазону modified."""
+
+    def __init__(self, state: State, batch_size: int, itersize: int) -> None:
+        self.state = state
+        self.batch_size = batch_size
+        self.itersize = itersize
+
+    def produce(
+        self, connection: _connection, table: str, watermark: dict
+    ) -> tuple[list[str], dict | None]:
+        """Возвращает пачку id после watermark и водяной знак ее последней записи.
+
+        Записи упорядочены по (modified, id), поэтому записи с одинаковым
+        modified на границе пачки не теряются и не читаются повторно.
+        """
+        with server_cursor(connection, self.itersize) as cursor:
+            cursor.execute(
+                CHANGED_IDS_QUERY.format(table=table),
+                (watermark["modified"], watermark["id"], self.batch_size),
+            )
+            rows = list(cursor)
+        if not rows:
+            return [], None
+        last_id, last_modified = rows[-1]
+        return [str(row[0]) for row in rows], {
+            "modified": last_modified.isoformat(),
+            "id": str(last_id),
+        }
+
+    def checkpoint(self, table: str) -> dict:
+        """Водяной знак таблицы: modified и id последней переданной записи."""
+        watermark = self.state.get_state(f"producer:{table}")
+        if isinstance(watermark, dict):
+            return watermark
+        # Раньше хранилась только дата, а до появления этапов общая для всех
+        modified = watermark or self.state.get_state("last_modified") or MIN_DATETIME
+        return {"modified": modified, "id": MIN_UUID}
+
+    def commit(self, table: str, watermark: dict) -> None:
+        """Сдвигает водяной знак после передачи пачки обогатителю."""
+        self.state.set_state(f"producer:{table}", watermark)
+
+
+class Enricher:
+    """Переводит id измененных записей в id затронутых документов.
+
+    Персоны и жанры меняют документы фильмов, а фильм меняет фильмографию
+    своих персон и сводку своих жанров.
+    """
+
+    queries = {
+        "person": {"movies": FILM_IDS_BY_PERSONS_QUERY},
+        "genre": {"movies": FILM_IDS_BY_GENRES_QUERY},
+        "film_work": {
+            "persons": PERSON_IDS_BY_FILMS_QUERY,
+            "genres": GENRE_IDS_BY_FILMS_QUERY,
+        },
+    }
+
+    # Жанров мало, а затрагивает их почти каждая пачка фильмов: сводки
+    # пересчитываются один раз в конце потока таблицы
+    deferred = {"film_work": ("genres",)}
+
+    def __init__(self, state: State, batch_size: int, itersize: int) -> None:
+        self.state = state
+        self.batch_size = batch_size
+        self.itersize = itersize
+
+    def enrich(
+        self,
+        connection: _connection,
+        table: str,
+        index: str,
+        ids: list[str],
+        last_id: str = MIN_UUID,
+    ) -> Iterator[list[str]]:
+        """Страницы id зависящих документов индекса по возрастанию id.
+
+        Начинает после документа last_id.
+        """
+        query = self.queries[table][index]
+        while True:
+            with server_cursor(connection, self.itersize) as cursor:
+                cursor.execute(query, (ids, last_id, self.batch_size))
+                related_ids = [str(row[0]) for row in cursor]
+            if not related_ids:
+                return
+            yield related_ids
+            last_id = related_ids[-1]
+
+    def pending(self, table: str) -> list[str] | None:
+        """Пачка, принятая от производителя, но еще не загруженная."""
+        return self.state.get_state(f"enricher:{table}")
+
+    def accept(self, table: str, ids: list[str]) -> None:
+        self.state.set_state(f"enricher:{table}", ids)
+
+    def progress(self, table: str, index: str) -> str:
+        """Последний загруженный зависящий документ индекса для пачки."""
+        return self.state.get_state(f"merger:{table}:{index}") or MIN_UUID
+
+    def advance(self, table: str, index: str, related_id: str) -> None:
+        """Запоминает последний загруженный зависящий документ индекса."""
+        self.state.set_state(f"merger:{table}:{index}", related_id)
+
+    def deferred_ids(self, table: str, index: str) -> list[str]:
+        """Зависящие документы, отложенные до конца потока таблицы."""
+        return self.state.get_state(f"deferred:{table}:{index}") or []
+
+    def defer(self, table: str, index: str, ids: list[str]) -> None:
+        ids = set(self.deferred_ids(table, index)) | set(ids)
+        self.state.set_state(f"deferred:{table}:{index}", sorted(ids))
+
+    def release(self, table: str, index: str) -> None:
+        """Снимает отложенные документы после их загрузки в ES."""
+        self.state.set_state(f"deferred:{table}:{index}", None)
+
+    def commit(self, table: str) -> None:
+        """Снимает пачку после загрузки всех ее документов в ES."""
+        self.state.set_state(f"enricher:{table}", None)
+        for index in self.queries.get(table, ()):
+            self.state.set_state(f"merger:{table}:{index}", None)
+
+
+class Merger:
+    """Собирает документы только для переданных id."""
+
+    def __init__(self, batch_size: int, itersize: int) -> None:
+        self.batch_size = batch_size
+        self.itersize = itersize
+
+    def merge(
+        self,
+        connection: _connection,
+        query: str,
+        validator: type[BaseModel],
+        ids: list[str],
+    ) -> Iterator[list[dict]]:
+        """Пачки документов не больше batch_size.
+
+        Строки читаются с сервера порциями по itersize кортежами, словарь
+        для валидации строится по именам колонок курсора. Колонка version
+        (время начала запроса в микросекундах) уходит в поле VERSION_FIELD:
+        документ, собранный по более свежему снимку базы, получает большую
+        версию, и ES не даст его перезаписать сборке соседнего потока.
+        """
+        with server_cursor(connection, self.itersize) as cursor:
+            cursor.execute(query, (ids,))
+            rows = iter(cursor)
+            while batch := list(islice(rows, self.batch_size)):
+                columns = [column.name for column in cursor.description]
+                yield [self.build(validator, dict(zip(columns, row))) for row in batch]
+
+    @staticmethod
+    def build(validator: type[BaseModel], row: dict) -> dict:
+        version = row.pop("version", None)
+        doc = validator(**row).model_dump(mode="json")
+        if version is not None:
+            doc[VERSION_FIELD] = version
+        return doc
@@ -9,9 +9,15 @@ class Person(BaseModel):
     name: str
 
 
+class FilmForPerson(BaseModel):
+    id: UUID
+    roles: list[str]
+
+
 class Person_Vld(BaseModel):
     id: UUID
     full_name: str = Field(alias="name")
+    films: list[FilmForPerson] = []
 
     class Config:
         allow_population_by_field_name = True
@@ -21,6 +27,9 @@ class Genre(BaseModel):
     id: UUID
     name: str
     description: str | None
+    film_count: int = 0
+    avg_rating: float | None = None
+    top_film_ids: list[UUID] = []
 
 
 class GenreForFilm(BaseModel):
@@ -41,3 +50,8 @@ class FilmWork(BaseModel):
     directors: list[Person]
     actors: list[Person]
     writers: list[Person]
+    genre_ids: list[UUID] = []
+    actor_ids: list[UUID] = []
+    writer_ids: list[UUID] = []
+    director_ids: list[UUID] = []
+    person_ids: list[UUID] = []
@@ -1,9 +1,11 @@
 import os
 import time
-import datetime
 import pathlib
 import sys
 
+import elastic_transport
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 
 from sqlite_to_postgres.transfer import make_transfer
@@ -11,12 +13,20 @@ from sqlite_to_postgres.transfer import make_transfer
 # from fake_to_postgres.main import main as make_transfer
 from state.state import State, JsonFileStorage
 from etl.loader import ElasticsearchLoader
-from etl.extractor import PostgresExtractor
+from etl.extractor import INDEX_TABLES, SOURCE_TABLES, PostgresExtractor
+from etl.hashes import ContentHashStore
+from etl.listener import PostgresListener
+from etl.notifier import RedisNotifier
 from settings import settings
 
 
 BASE_DIR = pathlib.Path(__file__).parent.resolve()
 LOG_PATH = os.path.join(BASE_DIR, settings.log_path)
+REBUILD_STATE_PATH = "rebuild_{index}.json"
+ES_CONNECTION_ERRORS = (
+    elastic_transport.ConnectionError,
+    elastic_transport.ConnectionTimeout,
+)
 
 logger.add(
     sys.stderr, format="{time} {level} {message}", filter="my_module", level="INFO"
@@ -24,6 +34,103 @@ logger.add(
 logger.add(LOG_PATH, retention="30 days")
 
 
+def load_stream(
+    table: str,
+    state: State,
+    notifier: RedisNotifier | None,
+    targets: dict | None = None,
+    enrich: bool = True,
+    hash_store: ContentHashStore | None = None,
+    ids: list[str] | None = None,
+) -> int:
+    """Переносит изменения одной таблицы на своем соединении и загрузчике.
+
+    Без ids изменения ищутся по водяным знакам, иначе грузятся ровно ids.
+    """
+    extractor = PostgresExtractor(
+        dict(settings.pg),
+        settings.batch_size,
+        state,
+        settings.pg_itersize,
+        tables=(table,),
+        enrich=enrich,
+    )
+    loader = ElasticsearchLoader(
+        dict(settings.es), settings.index_name, notifier, targets, hash_store
+    )
+    started = time.monotonic()
+    try:
+        if ids is None:
+            batches = extractor.extract_data()
+        else:
+            batches = extractor.extract_ids(table, ids)
+        loader.load_batches(batches)
+    finally:
+        loader.close_connection()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        logger.info(
+            f"{table}: обновлено {loader.loaded_count} записей, "
+            f"без изменений {loader.skipped_count}, "
+            f"ошибок {loader.failed_count}, "
+            f"{loader.loaded_count / elapsed:.0f} док/с"
+        )
+    return loader.loaded_count
+
+
+def run_stream(
+    table: str,
+    state: State,
+    notifier: RedisNotifier,
+    hash_store: ContentHashStore | None,
+    ids: list[str] | None = None,
+) -> int:
+    try:
+        return load_stream(table, state, notifier, hash_store=hash_store, ids=ids)
+    except psycopg2.OperationalError as error:
+        # Checkpoint-ы сдвигаются после каждой пачки, следующий цикл продолжит
+        logger.warning(f"Потеряно соединение с Postgres ({table}): {error}")
+        return 0
+    except ES_CONNECTION_ERRORS as error:
+        logger.warning(f"Потеряно соединение с ES ({table}): {error}")
+        return 0
+
+
+def rebuild_index(
+    name: str,
+    index: str,
+    loader: ElasticsearchLoader,
+    notifier: RedisNotifier,
+    hash_store: ContentHashStore | None,
+) -> bool:
+    """Заполняет новую версию индекса и атомарно переключает на нее псевдоним.
+
+    Пока идет сборка, API читает старую версию. Checkpoint-ы сборки лежат
+    в отдельном файле, оборванная сборка продолжится со следующим циклом.
+    """
+    state_path = REBUILD_STATE_PATH.format(index=index)
+    state = State(JsonFileStorage(state_path))
+    logger.info(f"{name}: пересборка в {index}")
+    loader.start_initial_load(index)
+    try:
+        load_stream(
+            INDEX_TABLES[name], state, None, targets={name: index}, enrich=False
+        )
+    except (psycopg2.OperationalError, *ES_CONNECTION_ERRORS) as error:
+        logger.warning(f"Пересборка {index} прервана: {error}")
+        return False
+    finally:
+        loader.finish_initial_load(index)
+    loader.swap_alias(name, index)
+    os.remove(state_path)
+    # Хеши описывали документы старой версии, новая собрана без их учета
+    if hash_store:
+        hash_store.clear(name)
+    # Закешированные страницы API построены по старой версии индекса
+    notifier.reset(name)
+    logger.info(f"{name}: псевдоним переключен на {index}")
+    return True
+
+
 @logger.catch()
 def start_pipilene() -> None:
     """ "Запускает процесс ETL."""
@@ -35,26 +142,71 @@ def start_pipilene() -> None:
 
     storage = JsonFileStorage(settings.json_path)
     state = State(storage)
-    extractor = PostgresExtractor(dict(settings.pg), 100)
-    loader = ElasticsearchLoader(dict(settings.es), settings.index_name)
+    notifier = RedisNotifier(
+        settings.redis_host, settings.redis_port, settings.cache_invalidation_channel
+    )
 
-    while True:
-        logger.info("Начало обновления")
-        update_count = 0
-        state_datetime = state.get_state("last_modified")
-        if state_datetime:
-            start_datetime = state_datetime
-        else:
-            start_datetime = datetime.date.min.isoformat()
+    hash_store = None
+    if settings.etl_skip_unchanged:
+        hash_store = ContentHashStore(settings.redis_host, settings.redis_port)
 
-        for key, value in extractor.extract_data(start_datetime).items():
-            update_count += len(value)
-            loader.load_data(key, value)
-        loader.close_connection()
+    # Создает индексы до запуска потоков и переключает пустые в режим загрузки
+    loader = ElasticsearchLoader(dict(settings.es), settings.index_name, notifier)
+    loader.restore_interrupted_initial_load()
 
-        state.set_state("last_modified", datetime.datetime.now().isoformat())
+    def run_cycle() -> None:
+        """Пересборки и сканирование всех таблиц по водяным знакам."""
+        logger.info("Начало обновления")
+        rebuilds = list(loader.rebuilds.items())
+        rebuilt = pool.map(
+            lambda item: rebuild_index(*item, loader, notifier, hash_store),
+            rebuilds,
+        )
+        for (name, _), ok in zip(rebuilds, rebuilt):
+            if ok:
+                del loader.rebuilds[name]
+        with loader.initial_load() as empty_indexes:
+            if hash_store:
+                # Пустой индекс мог быть пересоздан вручную, старым хешам не верим
+                for index in empty_indexes:
+                    hash_store.clear(index)
+            update_count = sum(
+                pool.map(
+                    lambda table: run_stream(table, state, notifier, hash_store),
+                    SOURCE_TABLES,
+                )
+            )
         logger.info(f"Конец. Всего обновлено {update_count} записей")
-        time.sleep(settings.sleep_time)
+
+    def run_changes(changes: dict) -> None:
+        """Загружает записи, о которых сообщили триггеры."""
+        update_count = sum(
+            pool.map(
+                lambda item: run_stream(item[0], state, notifier, hash_store, item[1]),
+                changes.items(),
+            )
+        )
+        logger.info(f"По уведомлениям обновлено {update_count} записей")
+
+    # Потоки таблиц независимы, число одновременных ограничивает нагрузку на Postgres
+    with ThreadPoolExecutor(max_workers=settings.etl_concurrency) as pool:
+        while True:
+            if not settings.etl_listen:
+                run_cycle()
+                time.sleep(settings.sleep_time)
+                continue
+            listener = PostgresListener(
+                dict(settings.pg), settings.etl_debounce, settings.etl_max_delay
+            )
+            try:
+                with listener:
+                    # Изменения, пропущенные без подписки, подберет сканирование
+                    run_cycle()
+                    for changes in listener.changes():
+                        run_changes(changes)
+            except psycopg2.OperationalError as error:
+                logger.warning(f"Потеряна подписка на изменения Postgres: {error}")
+                time.sleep(settings.sleep_time)
 
 
 if __name__ == "__main__":
@@ -35,11 +35,27 @@ class Settings(BaseSettings):
     project_name: str = "FastAPI Project"
     redis_host: str = Field(..., alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
+    cache_invalidation_channel: str = Field(
+        "cache_invalidation", alias="CACHE_INVALIDATION_CHANNEL"
+    )
     scheme: str = "http"
     index_name: list[str] = ["movies", "genres", "persons"]
     json_path: str = "state.json"
     log_path: str = "logs/main_log.log"
     sleep_time: int = 10
+    batch_size: int = Field(100, alias="ETL_BATCH_SIZE")
+    pg_itersize: int = Field(1000, alias="PG_ITERSIZE")
+    etl_concurrency: int = Field(3, alias="ETL_CONCURRENCY")
+    bulk_thread_count: int = Field(4, alias="ES_BULK_THREAD_COUNT")
+    bulk_chunk_size: int = Field(500, alias="ES_BULK_CHUNK_SIZE")
+    bulk_max_chunk_bytes: int = Field(10 * 1024 * 1024, alias="ES_BULK_MAX_CHUNK_BYTES")
+    es_forcemerge_after_initial_load: bool = Field(
+        False, alias="ES_FORCEMERGE_AFTER_INITIAL_LOAD"
+    )
+    etl_listen: bool = Field(False, alias="ETL_LISTEN")
+    etl_debounce: float = Field(1.0, alias="ETL_DEBOUNCE_SECONDS")
+    etl_max_delay: float = Field(10.0, alias="ETL_MAX_DELAY_SECONDS")
+    etl_skip_unchanged: bool = Field(True, alias="ETL_SKIP_UNCHANGED")
     max_tries: int = 7
     max_time: int = 25
 
@@ -1,6 +1,7 @@
 import abc
 import json
 import os
+import threading
 from typing import Any, Dict
 
 
@@ -19,21 +20,25 @@ class JsonFileStorage(BaseStorage):
 
     def __init__(self, file_path: str) -> None:
         self.file_path = file_path
+        # Состояние пишут потоки разных таблиц, файл читается и пишется целиком
+        self._lock = threading.RLock()
         if not os.path.exists(file_path):
             with open(self.file_path, "w") as f:
                 json.dump({}, f)
 
     def save_state(self, state: Dict[str, Any]) -> None:
         """Сохранить состояние в хранилище."""
-        new_state = self.retrieve_state()
-        new_state.update(state)
-        with open(self.file_path, "w") as f:
-            json.dump(new_state, f)
+        with self._lock:
+            new_state = self.retrieve_state()
+            new_state.update(state)
+            with open(self.file_path, "w") as f:
+                json.dump(new_state, f)
 
     def retrieve_state(self) -> Dict[str, Any]:
         """Получить состояние из хранилища."""
-        with open(self.file_path, "r") as f:
-            return json.load(f)
+        with self._lock:
+            with open(self.file_path, "r") as f:
+                return json.load(f)
 
 
 class State:
@@ -45,3 +45,44 @@ CREATE TABLE IF NOT EXISTS content.person_film_work (
 CREATE INDEX film_work_creation_date_idx ON content.film_work(creation_date);
 CREATE UNIQUE INDEX film_work_person_idx ON content.person_film_work (film_work_id, person_id, role);
 CREATE UNIQUE INDEX film_work_genre_idx ON content.genre_film_work (film_work_id, genre_id);
+CREATE INDEX film_work_modified_idx ON content.film_work (modified, id);
+CREATE INDEX person_modified_idx ON content.person (modified, id);
+CREATE INDEX genre_modified_idx ON content.genre (modified, id);
+CREATE INDEX person_film_work_person_idx ON content.person_film_work (person_id, film_work_id);
+CREATE INDEX genre_film_work_genre_idx ON content.genre_film_work (genre_id, film_work_id);
+
+CREATE OR REPLACE FUNCTION content.notify_etl() RETURNS trigger AS $$
+DECLARE
+    rec record;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    -- Изменение связи меняет документ фильма, а также фильмографию персоны
+    -- или сводку жанра, в том числе уже не связанных с фильмом
+    IF TG_TABLE_NAME IN ('person_film_work', 'genre_film_work') THEN
+        PERFORM pg_notify('etl_changes', json_build_object('table', 'film_work', 'id', rec.film_work_id)::text);
+    ELSE
+        PERFORM pg_notify('etl_changes', json_build_object('table', TG_TABLE_NAME, 'id', rec.id)::text);
+    END IF;
+    IF TG_TABLE_NAME = 'person_film_work' THEN
+        PERFORM pg_notify('etl_changes', json_build_object('table', 'person', 'id', rec.person_id)::text);
+    ELSIF TG_TABLE_NAME = 'genre_film_work' THEN
+        PERFORM pg_notify('etl_changes', json_build_object('table', 'genre', 'id', rec.genre_id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER film_work_notify_etl AFTER INSERT OR UPDATE ON content.film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl();
+CREATE TRIGGER person_notify_etl AFTER INSERT OR UPDATE ON content.person
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl();
+CREATE TRIGGER genre_notify_etl AFTER INSERT OR UPDATE ON content.genre
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl();
+CREATE TRIGGER person_film_work_notify_etl AFTER INSERT OR UPDATE OR DELETE ON content.person_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl();
+CREATE TRIGGER genre_film_work_notify_etl AFTER INSERT OR UPDATE OR DELETE ON content.genre_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_etl();
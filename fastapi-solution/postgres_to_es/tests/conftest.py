@@ -0,0 +1,171 @@
+import json
+import pathlib
+import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import elastic_transport
+import psycopg2
+import pytest
+
+APP_DIR = pathlib.Path(__file__).parent.parent.resolve() / "app"
+sys.path.append(str(APP_DIR))
+
+from etl import loader as loader_module  # noqa: E402
+from etl.extractor import PostgresExtractor  # noqa: E402
+from etl.hashes import ContentHashStore  # noqa: E402
+from settings import settings  # noqa: E402
+from state.state import JsonFileStorage, State  # noqa: E402
+
+
+class Uncommitted:
+    """Соединение теста для кода, который сам фиксирует транзакции.
+
+    commit ничего не делает: данные теста откатываются в конце.
+    """
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    def commit(self) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        return getattr(self.connection, name)
+
+
+class FakeElasticsearch:
+    """ES в памяти для bulk-хелперов, запросы приходят из потоков пула.
+
+    Документы с id из failing отклоняются, а bulk-запрос с номером crash_on
+    обрывается ошибкой соединения.
+    """
+
+    transport = SimpleNamespace(
+        serializers=elastic_transport.SerializerCollection(
+            {"application/json": elastic_transport.JsonSerializer()}
+        )
+    )
+
+    def __init__(self) -> None:
+        self.docs = {}
+        self.indexed = Counter()
+        self.failing = set()
+        self.crash_on = None
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def options(self, **kwargs) -> "FakeElasticsearch":
+        return self
+
+    def bulk(self, operations: list, **kwargs) -> elastic_transport.ObjectApiResponse:
+        lines = [json.loads(line) for line in operations]
+        items = []
+        with self.lock:
+            self.requests += 1
+            if self.requests == self.crash_on:
+                raise elastic_transport.ConnectionError("connection lost")
+            for action, doc in zip(lines[::2], lines[1::2]):
+                meta = action["index"]
+                status = 400 if meta["_id"] in self.failing else 201
+                if status == 201:
+                    self.docs[meta["_id"]] = doc
+                    self.indexed[meta["_id"]] += 1
+                items.append({"index": {**meta, "status": status}})
+        errors = any(item["index"]["status"] >= 300 for item in items)
+        body = {"took": 1, "errors": errors, "items": items}
+        return elastic_transport.ObjectApiResponse(body=body, meta=None)
+
+    def loaded(self) -> set:
+        with self.lock:
+            return set(self.docs)
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryHashStore(ContentHashStore):
+    """Хеши загруженных документов в словаре вместо Redis."""
+
+    def __init__(self) -> None:
+        self.hashes = defaultdict(dict)
+
+    def changed(self, index: str, docs: list) -> tuple[list, dict]:
+        hashes = {doc["id"]: self.doc_hash(doc) for doc in docs}
+        stored = self.hashes[index]
+        changed = [doc for doc in docs if stored.get(doc["id"]) != hashes[doc["id"]]]
+        return changed, {doc["id"]: hashes[doc["id"]] for doc in changed}
+
+    def save(self, index: str, hashes: dict) -> None:
+        self.hashes[index].update(hashes)
+
+
+@pytest.fixture
+def pg_connection():
+    """Соединение с Postgres, все изменения теста откатываются."""
+    connection = psycopg2.connect(**dict(settings.pg))
+    try:
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def pg_insert(pg_connection):
+    def inner(table: str, **row) -> None:
+        columns = ", ".join(row)
+        values = ", ".join(["%s"] * len(row))
+        with pg_connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO content.{table} ({columns}) VALUES ({values})",
+                list(row.values()),
+            )
+
+    return inner
+
+
+@pytest.fixture
+def state(tmp_path):
+    return State(JsonFileStorage(str(tmp_path / "state.json")))
+
+
+@pytest.fixture
+def make_extractor(pg_connection, state):
+    """Извлекатель на соединении теста; новый вызов - перезапуск ETL."""
+
+    def inner(**kwargs) -> PostgresExtractor:
+        extractor = PostgresExtractor(
+            dict(settings.pg), batch_size=2, state=state, itersize=2, **kwargs
+        )
+        extractor.conn_context_pg = lambda dsl: nullcontext(Uncommitted(pg_connection))
+        return extractor
+
+    return inner
+
+
+@pytest.fixture
+def es_client(monkeypatch):
+    client = FakeElasticsearch()
+    monkeypatch.setattr(loader_module, "Elasticsearch", lambda hosts: client)
+    return client
+
+
+@pytest.fixture
+def hash_store():
+    return MemoryHashStore()
+
+
+@pytest.fixture
+def make_loader(es_client, monkeypatch):
+    """Загрузчик без схем и настроек индексов: проверяется только загрузка."""
+    loader_class = loader_module.ElasticsearchLoader
+    monkeypatch.setattr(loader_class, "make_index", lambda self: None)
+    monkeypatch.setattr(loader_class, "in_initial_load", lambda self, index: False)
+
+    def inner(hash_store: ContentHashStore | None = None):
+        return loader_class({}, settings.index_name, hash_store=hash_store)
+
+    return inner
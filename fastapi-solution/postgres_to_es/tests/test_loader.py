@@ -0,0 +1,102 @@
+import elastic_transport
+import pytest
+
+from settings import settings
+
+
+@pytest.fixture(params=[1, 4], ids=["streaming_bulk", "parallel_bulk"])
+def bulk_settings(request, monkeypatch):
+    """Мелкие чанки, чтобы чанки bulk-хелпера резали пачки посередине."""
+    monkeypatch.setattr(settings, "bulk_thread_count", request.param)
+    monkeypatch.setattr(settings, "bulk_chunk_size", 3)
+
+
+pytestmark = pytest.mark.usefixtures("bulk_settings")
+
+
+def make_docs(prefix: str, count: int) -> list[dict]:
+    return [{"id": f"{prefix}{number}", "title": "Star"} for number in range(count)]
+
+
+def make_stream(es_client, applied: list, count: int = 6) -> list[tuple]:
+    """Пачки двух индексов вперемешку, за каждой пачкой свой checkpoint.
+
+    Checkpoint запоминает, какие документы были в ES к его применению.
+    """
+    batches = []
+    for number in range(count):
+        key = ("movies", "persons")[number % 2]
+        batches.append((key, make_docs(f"{key}-{number}-", 4), None))
+        batches.append(
+            (
+                key,
+                [],
+                lambda number=number: applied.append((number, es_client.loaded())),
+            )
+        )
+    return batches
+
+
+def docs_before(batches: list, number: int) -> set:
+    """Id документов всех пачек до checkpoint-а с этим номером."""
+    return {doc["id"] for _, docs, _ in batches[: 2 * (number + 1)] for doc in docs}
+
+
+def test_checkpoints_wait_for_earlier_documents(es_client, make_loader):
+    applied = []
+    batches = make_stream(es_client, applied)
+
+    make_loader().load_batches(batches)
+
+    assert [number for number, _ in applied] == list(range(6))
+    for number, loaded in applied:
+        assert docs_before(batches, number) <= loaded
+    assert es_client.loaded() == docs_before(batches, 5)
+
+
+def test_restart_after_lost_connection(es_client, make_loader):
+    applied = []
+    batches = make_stream(es_client, applied)
+    es_client.crash_on = 4
+
+    with pytest.raises(elastic_transport.ConnectionError):
+        make_loader().load_batches(batches)
+
+    # Применены только checkpoint-ы подряд с начала, все до них уже в ES
+    numbers = [number for number, _ in applied]
+    assert numbers == list(range(len(numbers)))
+    assert len(numbers) < 6
+    for number, loaded in applied:
+        assert docs_before(batches, number) <= loaded
+
+    # Перезапуск продолжает с пачки после последнего checkpoint-а
+    confirmed = docs_before(batches, numbers[-1]) if numbers else set()
+    es_client.crash_on = None
+    make_loader().load_batches(batches[2 * len(numbers) :])
+
+    assert es_client.loaded() == docs_before(batches, 5)
+    assert all(es_client.indexed[doc_id] == 1 for doc_id in confirmed)
+
+
+def test_failed_documents_keep_hash_and_checkpoint(es_client, make_loader, hash_store):
+    applied = []
+    docs = make_docs("film-", 4)
+    es_client.failing = {"film-1"}
+
+    loader = make_loader(hash_store)
+    loader.load_batches([("movies", docs, lambda: applied.append(True))])
+
+    # Ошибка документа не держит checkpoint, но его хеш не сохраняется
+    assert applied == [True]
+    assert loader.loaded_count == 3
+    assert loader.failed_count == 1
+    assert set(hash_store.hashes["movies"]) == {"film-0", "film-2", "film-3"}
+
+    es_client.failing = set()
+    loader = make_loader(hash_store)
+    loader.load_batches([("movies", make_docs("film-", 4), None)])
+
+    assert loader.skipped_count == 3
+    assert loader.loaded_count == 1
+    assert es_client.indexed["film-1"] == 1
+    assert set(hash_store.hashes["movies"]) == {doc["id"] for doc in docs}
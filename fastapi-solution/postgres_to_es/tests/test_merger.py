@@ -0,0 +1,74 @@
+import uuid
+
+from data.query import FILMS_BY_IDS_QUERY, GENRES_BY_IDS_QUERY, PERSONS_BY_IDS_QUERY
+from etl.pipeline import VERSION_FIELD, Merger
+from etl.validation import FilmWork, Genre, Person_Vld
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def test_merge_film_flat_ids(pg_connection, pg_insert):
+    film_id, genre_id, actor_id, director_id = (new_id() for _ in range(4))
+    pg_insert("film_work", id=film_id, title="The Star", rating=8.5, type="movie")
+    pg_insert("genre", id=genre_id, name="Action")
+    pg_insert("person", id=actor_id, full_name="Ann")
+    pg_insert("person", id=director_id, full_name="Stan")
+    pg_insert("genre_film_work", id=new_id(), genre_id=genre_id, film_work_id=film_id)
+    for person_id, role in ((actor_id, "actor"), (director_id, "director")):
+        pg_insert(
+            "person_film_work",
+            id=new_id(),
+            person_id=person_id,
+            film_work_id=film_id,
+            role=role,
+        )
+
+    merger = Merger(batch_size=10, itersize=10)
+    [docs] = merger.merge(pg_connection, FILMS_BY_IDS_QUERY, FilmWork, [film_id])
+
+    [doc] = docs
+    assert doc["id"] == film_id
+    assert doc["genre_ids"] == [genre_id]
+    assert doc["actor_ids"] == [actor_id]
+    assert doc["writer_ids"] == []
+    assert doc["director_ids"] == [director_id]
+    assert sorted(doc["person_ids"]) == sorted([actor_id, director_id])
+
+
+def test_merge_genre_top_films(pg_connection, pg_insert):
+    genre_id, empty_genre_id = new_id(), new_id()
+    pg_insert("genre", id=genre_id, name="Action")
+    pg_insert("genre", id=empty_genre_id, name="Comedy")
+    film_ids = [new_id() for _ in range(3)]
+    for rating, film_id in zip((5.0, 9.0, 7.0), film_ids):
+        pg_insert(
+            "film_work", id=film_id, title="The Star", rating=rating, type="movie"
+        )
+        pg_insert(
+            "genre_film_work", id=new_id(), genre_id=genre_id, film_work_id=film_id
+        )
+
+    merger = Merger(batch_size=10, itersize=10)
+    [docs] = merger.merge(
+        pg_connection, GENRES_BY_IDS_QUERY, Genre, [genre_id, empty_genre_id]
+    )
+
+    genres = {doc["id"]: doc for doc in docs}
+    assert genres[genre_id]["film_count"] == 3
+    assert genres[genre_id]["avg_rating"] == 7.0
+    assert genres[genre_id]["top_film_ids"] == [film_ids[1], film_ids[2], film_ids[0]]
+    assert genres[empty_genre_id]["film_count"] == 0
+    assert genres[empty_genre_id]["top_film_ids"] == []
+
+
+def test_merge_versions_follow_snapshots(pg_connection, pg_insert):
+    person_id = new_id()
+    pg_insert("person", id=person_id, full_name="Ann")
+
+    merger = Merger(batch_size=10, itersize=10)
+    [[old]] = merger.merge(pg_connection, PERSONS_BY_IDS_QUERY, Person_Vld, [person_id])
+    [[new]] = merger.merge(pg_connection, PERSONS_BY_IDS_QUERY, Person_Vld, [person_id])
+
+    assert new[VERSION_FIELD] > old[VERSION_FIELD]
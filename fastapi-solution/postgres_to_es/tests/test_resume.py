@@ -0,0 +1,160 @@
+import datetime
+import uuid
+from collections import defaultdict
+
+import pytest
+
+from etl.extractor import SOURCE_TABLES
+from etl.pipeline import MIN_UUID
+
+# Записи теста новее всех данных базы, производитель начинает сразу перед ними
+MODIFIED = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+WATERMARK = {"modified": "2099-01-01T00:00:00+00:00", "id": MIN_UUID}
+
+
+def new_ids(count: int) -> list[str]:
+    return sorted(str(uuid.uuid4()) for _ in range(count))
+
+
+@pytest.fixture
+def catalog(pg_insert, state):
+    """Три фильма с одним modified, три актера первого фильма и два жанра.
+
+    Пачками по 2 фильма актеры первого фильма собираются двумя страницами,
+    а жанры откладываются до конца потока фильмов.
+    """
+    films, persons, genres = new_ids(3), new_ids(3), new_ids(2)
+    for film_id in films:
+        pg_insert(
+            "film_work", id=film_id, title="Star", type="movie", modified=MODIFIED
+        )
+    for person_id in persons:
+        pg_insert("person", id=person_id, full_name="Ann", modified=MODIFIED)
+        pg_insert(
+            "person_film_work",
+            id=str(uuid.uuid4()),
+            person_id=person_id,
+            film_work_id=films[0],
+            role="actor",
+        )
+    for genre_id, film_id in zip(genres, (films[0], films[2])):
+        pg_insert("genre", id=genre_id, name="Action", modified=MODIFIED)
+        pg_insert(
+            "genre_film_work",
+            id=str(uuid.uuid4()),
+            genre_id=genre_id,
+            film_work_id=film_id,
+        )
+    for table in SOURCE_TABLES:
+        state.set_state(f"producer:{table}", WATERMARK)
+    return {"movies": films, "persons": persons, "genres": genres}
+
+
+def stop_after(name: str, count: int = 1):
+    """Обрывает поток сразу после count-го checkpoint-а с этим именем."""
+    seen = []
+
+    def inner(checkpoint) -> bool:
+        seen.extend([checkpoint.func.__name__] if checkpoint else [])
+        return seen.count(name) == count
+
+    return inner
+
+
+def load(extractor, stop=None) -> dict:
+    """Грузит пачки как загрузчик: checkpoint после всех документов до него."""
+    loaded = defaultdict(list)
+    batches = extractor.extract_data()
+    for index, docs, checkpoint in batches:
+        loaded[index].extend(doc["id"] for doc in docs)
+        if checkpoint:
+            checkpoint()
+        if stop and stop(checkpoint):
+            batches.close()
+            break
+    return loaded
+
+
+def test_restart_after_producer_batch(catalog, make_extractor, state):
+    films = catalog["movies"]
+
+    first = load(
+        make_extractor(tables=("film_work",), enrich=False), stop_after("commit")
+    )
+
+    assert first["movies"] == films[:2]
+    assert state.get_state("producer:film_work")["id"] == films[1]
+    assert state.get_state("enricher:film_work") is None
+    # У фильмов одинаковый modified: граница пачки держится на id
+    second = load(make_extractor(tables=("film_work",), enrich=False))
+    assert second["movies"] == films[2:]
+
+
+def test_restart_reloads_pending_batch(catalog, make_extractor, state):
+    films = catalog["movies"]
+
+    first = load(
+        make_extractor(tables=("film_work",), enrich=False), stop_after("_accept")
+    )
+
+    assert first["movies"] == []
+    assert state.get_state("enricher:film_work") == films[:2]
+    assert state.get_state("producer:film_work")["id"] == films[1]
+    second = load(make_extractor(tables=("film_work",), enrich=False))
+    assert second["movies"] == films
+
+
+def test_restart_resumes_related_documents(catalog, make_extractor, state):
+    films, persons = catalog["movies"], catalog["persons"]
+
+    first = load(make_extractor(tables=("film_work",)), stop_after("advance"))
+
+    assert first["persons"] == persons[:2]
+    assert state.get_state("merger:film_work:persons") == persons[1]
+    second = load(make_extractor(tables=("film_work",)))
+    assert second["movies"] == films
+    assert second["persons"] == persons[2:]
+    assert state.get_state("merger:film_work:persons") is None
+
+
+def test_restart_keeps_deferred_ids(catalog, make_extractor, state):
+    genres = catalog["genres"]
+
+    first = load(make_extractor(tables=("film_work",)), stop_after("commit", 2))
+
+    assert first["genres"] == []
+    assert state.get_state("deferred:film_work:genres") == genres
+    second = load(make_extractor(tables=("film_work",)))
+    assert second["movies"] == []
+    assert second["genres"] == genres
+    assert state.get_state("deferred:film_work:genres") is None
+
+
+@pytest.mark.parametrize(
+    "name, count, reloaded",
+    [
+        ("_accept", 1, 0),
+        ("advance", 1, 2),
+        ("advance", 2, 2),
+        ("defer", 1, 2),
+        ("commit", 1, 0),
+        ("_accept", 2, 0),
+        ("commit", 2, 0),
+    ],
+)
+def test_restart_neither_skips_nor_reloads(
+    catalog, make_extractor, state, name, count, reloaded
+):
+    first = load(make_extractor(tables=("film_work",)), stop_after(name, count))
+    second = load(make_extractor(tables=("film_work",)))
+
+    for index, ids in catalog.items():
+        assert sorted(set(first[index] + second[index])) == ids
+    # Повторно грузятся только фильмы прерванной пачки производителя
+    assert sorted(set(first["movies"]) & set(second["movies"])) == (
+        catalog["movies"][:reloaded]
+    )
+    assert not set(first["persons"]) & set(second["persons"])
+    assert not set(first["genres"]) & set(second["genres"])
+    assert state.get_state("enricher:film_work") is None
+    assert state.get_state("deferred:film_work:genres") is None
@@ -0,0 +1,28 @@
+"""Ответы на ошибки сервисов, общие для всех роутеров."""
+
+from http import HTTPStatus
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
+
+from services.cursor import InvalidCursorError, PitUnavailableError
+
+
+async def invalid_cursor(request: Request, exc: InvalidCursorError) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=HTTPStatus.BAD_REQUEST,
+        content={"detail": "invalid or expired cursor"},
+    )
+
+
+async def pit_unavailable(request: Request, exc: PitUnavailableError) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        content={"detail": "search context is unavailable"},
+    )
+
+
+exception_handlers = {
+    InvalidCursorError: invalid_cursor,
+    PitUnavailableError: pit_unavailable,
+}
@@ -1,9 +1,11 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Annotated
 
 from services.films import FilmService, get_film_service
+from models.base import BatchRequest, CursorPage
 from models.films import Film, FilmBase
 
 router = APIRouter()
@@ -19,6 +21,7 @@ router = APIRouter()
 )
 async def all_films(
     genre: Annotated[str, Query(description="Жанр для фильтрации")] = None,
+    person: Annotated[str, Query(description="Персона для фильтрации")] = None,
     sort: Annotated[str, Query(description="Текст для поиска")] = "-imdb_rating",
     page_size: Annotated[
         int, Query(description="Объем страницы при пагинации", ge=1)
@@ -27,14 +30,21 @@ async def all_films(
         int, Query(description="Номер страницы при пагинации", ge=1)
     ] = 1,
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmBase]:
+) -> Response:
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="page_size * page_number give more than 10000",
         )
-    films = await film_service.get_all(genre, sort, page_size, page_number)
-    return films
+    films = await film_service.get_page(
+        "get_all",
+        genre=genre,
+        person=person,
+        sort=sort,
+        page_size=page_size,
+        page_number=page_number,
+    )
+    return Response(films, media_type="application/json")
 
 
 @router.get(
@@ -54,14 +64,91 @@ async def films_search(
         int, Query(description="Номер страницы при пагинации", ge=1)
     ] = 1,
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmBase]:
+) -> Response:
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="page_size * page_number give more than 10000",
         )
-    films = await film_service.search(query, page_size, page_number)
-    return films
+    films = await film_service.get_page(
+        "search", query=query, page_size=page_size, page_number=page_number
+    )
+    return Response(films, media_type="application/json")
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[FilmBase],
+    response_model_by_alias=False,
+    summary="Cписок фильмов по курсору",
+    description="Получить список фильмов постранично по курсору",
+    response_description="Страница фильмов и курсор следующей страницы",
+)
+async def all_films_cursor(
+    genre: Annotated[str, Query(description="Жанр для фильтрации")] = None,
+    person: Annotated[str, Query(description="Персона для фильтрации")] = None,
+    sort: Annotated[str, Query(description="Поле сортировки")] = "-imdb_rating",
+    page_size: Annotated[int, Query(description="Объем страницы", ge=1, le=10000)] = 50,
+    cursor: Annotated[str, Query(description="Курсор из предыдущего ответа")] = None,
+    film_service: FilmService = Depends(get_film_service),
+) -> CursorPage[FilmBase]:
+    films, next_cursor = await film_service.get_all_cursor(
+        genre, person, sort, page_size, cursor
+    )
+    return CursorPage(items=films, next_cursor=next_cursor)
+
+
+@router.get(
+    "/search/cursor",
+    response_model=CursorPage[FilmBase],
+    response_model_by_alias=False,
+    summary="Поиск фильмов по курсору",
+    description="Полнотекстовый поиск фильмов постранично по курсору",
+    response_description="Страница фильмов и курсор следующей страницы",
+)
+async def films_search_cursor(
+    query: Annotated[str, Query(description="Текст для поиска")],
+    page_size: Annotated[int, Query(description="Объем страницы", ge=1, le=10000)] = 50,
+    cursor: Annotated[str, Query(description="Курсор из предыдущего ответа")] = None,
+    film_service: FilmService = Depends(get_film_service),
+) -> CursorPage[FilmBase]:
+    films, next_cursor = await film_service.search_cursor(query, page_size, cursor)
+    return CursorPage(items=films, next_cursor=next_cursor)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Выгрузка фильмов",
+    description="Потоковая выгрузка всего каталога фильмов в формате NDJSON",
+    response_description="Документы индекса фильмов, по одному в строке",
+)
+async def films_export(
+    genre: Annotated[str, Query(description="Жанр для фильтрации")] = None,
+    person: Annotated[str, Query(description="Персона для фильтрации")] = None,
+    fields: Annotated[
+        str, Query(description="Поля документа через запятую, по умолчанию все")
+    ] = None,
+    film_service: FilmService = Depends(get_film_service),
+) -> StreamingResponse:
+    if fields:
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    content = await film_service.export(genre, person, fields)
+    return StreamingResponse(content, media_type="application/x-ndjson")
+
+
+@router.post(
+    "/batch",
+    response_model=list[Film | None],
+    response_model_by_alias=False,
+    summary="Фильмы по списку uuid",
+    description="Получить несколько фильмов за один запрос",
+    response_description="Фильмы в порядке запроса, null для ненайденных",
+)
+async def films_batch(
+    batch: BatchRequest, film_service: FilmService = Depends(get_film_service)
+) -> list[Film | None]:
+    return await film_service.get_many(batch.ids)
 
 
 @router.get(
@@ -74,8 +161,8 @@ async def films_search(
 )
 async def film_details(
     film_id: str, film_service: FilmService = Depends(get_film_service)
-) -> Film:
-    film = await film_service.get_by_id(film_id)
+) -> Response:
+    film = await film_service.get_by_id_json(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
-    return Film(**film.dict())
+    return Response(film, media_type="application/json")
@@ -1,7 +1,8 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
+from models.base import BatchRequest
 from models.genres import Genre
 from services.genres import GenreService, get_genre_service
 
@@ -18,8 +19,23 @@ router = APIRouter()
 )
 async def genres(
     genre_service: GenreService = Depends(get_genre_service),
-) -> list[Genre]:
-    return await genre_service.get_all()
+) -> Response:
+    genres = await genre_service.get_page("get_all")
+    return Response(genres, media_type="application/json")
+
+
+@router.post(
+    "/batch",
+    response_model=list[Genre | None],
+    response_model_by_alias=False,
+    summary="Жанры по списку uuid",
+    description="Получить несколько жанров за один запрос",
+    response_description="Жанры в порядке запроса, null для ненайденных",
+)
+async def genres_batch(
+    batch: BatchRequest, genre_service: GenreService = Depends(get_genre_service)
+) -> list[Genre | None]:
+    return await genre_service.get_many(batch.ids)
 
 
 @router.get(
@@ -32,8 +48,8 @@ async def genres(
 )
 async def genre_details(
     genre_id: str, genre_service: GenreService = Depends(get_genre_service)
-) -> Genre:
-    genre = await genre_service.get_by_id(genre_id)
+) -> Response:
+    genre = await genre_service.get_by_id_json(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
-    return genre
+    return Response(genre, media_type="application/json")
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from db.pool_stats import pool_stats
+from models.metrics import LocalCacheStats, PoolStats
+from services.local_cache import local_caches
+
+router = APIRouter()
+
+
+@router.get(
+    "/cache",
+    response_model=dict[str, LocalCacheStats],
+    summary="Статистика локального кеша",
+    description="Попадания, промахи и вытеснения локального кеша воркера",
+    response_description="Счетчики по индексам",
+)
+async def cache_stats() -> dict[str, LocalCacheStats]:
+    return {name: cache.stats() for name, cache in local_caches.items()}
+
+
+@router.get(
+    "/pools",
+    response_model=dict[str, PoolStats],
+    summary="Статистика пулов соединений",
+    description="Занятость пулов ES и Redis и время ожидания свободного соединения",
+    response_description="Счетчики по пулам",
+)
+async def pools_stats() -> dict[str, PoolStats]:
+    return {name: stats.stats() for name, stats in pool_stats.items()}
@@ -1,10 +1,12 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Annotated
 
+from models.base import BatchRequest, CursorPage
 from models.persons import PersonWithFilms
 from models.films import FilmBase
+from services.base import EMPTY_PAGE
 from services.persons import PersonService, get_person_service
 
 router = APIRouter()
@@ -27,14 +29,49 @@ async def persons(
         int, Query(description="Номер страницы при пагинации", ge=1)
     ] = 1,
     person_service: PersonService = Depends(get_person_service),
-) -> list[PersonWithFilms]:
+) -> Response:
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="page_size * page_number give more than 10000",
         )
-    persons = await person_service.search(query, page_size, page_number)
-    return persons
+    persons = await person_service.get_page(
+        "search", query=query, page_size=page_size, page_number=page_number
+    )
+    return Response(persons, media_type="application/json")
+
+
+@router.get(
+    "/search/cursor",
+    response_model=CursorPage[PersonWithFilms],
+    response_model_by_alias=False,
+    summary="Поиск персон по курсору",
+    description="Полнотекстовый поиск среди персон постранично по курсору",
+    response_description="Страница персон с фильмами и курсор следующей страницы",
+)
+async def persons_cursor(
+    query: Annotated[str, Query(description="Текст для поиска")],
+    page_size: Annotated[int, Query(description="Объем страницы", ge=1, le=10000)] = 50,
+    cursor: Annotated[str, Query(description="Курсор из предыдущего ответа")] = None,
+    person_service: PersonService = Depends(get_person_service),
+) -> CursorPage[PersonWithFilms]:
+    persons, next_cursor = await person_service.search_cursor(query, page_size, cursor)
+    return CursorPage(items=persons, next_cursor=next_cursor)
+
+
+@router.post(
+    "/batch",
+    response_model=list[PersonWithFilms | None],
+    response_model_by_alias=False,
+    summary="Персоны по списку uuid",
+    description="Получить несколько персон с фильмами за один запрос",
+    response_description="Персоны в порядке запроса, null для ненайденных",
+)
+async def persons_batch(
+    batch: BatchRequest,
+    person_service: PersonService = Depends(get_person_service),
+) -> list[PersonWithFilms | None]:
+    return await person_service.get_many(batch.ids)
 
 
 @router.get(
@@ -47,11 +84,11 @@ async def persons(
 )
 async def person_details(
     person_id: str, person_service: PersonService = Depends(get_person_service)
-) -> PersonWithFilms:
-    person = await person_service.get_by_id(person_id)
+) -> Response:
+    person = await person_service.get_by_id_json(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    return person
+    return Response(person, media_type="application/json")
 
 
 @router.get(
@@ -71,13 +108,35 @@ async def person_films(
         int, Query(description="Номер страницы при пагинации", ge=1)
     ] = 1,
     person_service: PersonService = Depends(get_person_service),
-) -> list[FilmBase]:
+) -> Response:
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="page_size * page_number give more than 10000",
         )
-    films = await person_service.get_films(person_id, page_size, page_number)
-    if not films:
+    films = await person_service.get_page(
+        "get_films", obj_id=person_id, page_size=page_size, page_number=page_number
+    )
+    if films == EMPTY_PAGE:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    return films
+    return Response(films, media_type="application/json")
+
+
+@router.get(
+    "/{person_id}/film/cursor",
+    response_model=CursorPage[FilmBase],
+    response_model_by_alias=False,
+    summary="Фильмы по персоне по курсору",
+    description="Получить фильмы персоны постранично по курсору",
+    response_description="Страница фильмов персоны и курсор следующей страницы",
+)
+async def person_films_cursor(
+    person_id: str,
+    page_size: Annotated[int, Query(description="Объем страницы", ge=1, le=10000)] = 50,
+    cursor: Annotated[str, Query(description="Курсор из предыдущего ответа")] = None,
+    person_service: PersonService = Depends(get_person_service),
+) -> CursorPage[FilmBase]:
+    films, next_cursor = await person_service.get_films_cursor(
+        person_id, page_size, cursor
+    )
+    return CursorPage(items=films, next_cursor=next_cursor)
@@ -14,9 +14,55 @@ class Settings(BaseSettings):
     
     es_host: str = Field("127.0.0.1", alias="ELASTIC_HOST")
     es_port: int = Field(9200, alias="ELASTIC_PORT")
+    # Пул соединений клиента ES: maxsize соединений на каждый узел
+    es_maxsize: int = Field(10, alias="ELASTIC_MAXSIZE")
+    es_timeout: float = Field(10, alias="ELASTIC_TIMEOUT")
+    es_max_retries: int = Field(3, alias="ELASTIC_MAX_RETRIES")
+    es_retry_on_timeout: bool = Field(False, alias="ELASTIC_RETRY_ON_TIMEOUT")
+    es_http_compress: bool = Field(False, alias="ELASTIC_HTTP_COMPRESS")
+    es_keepalive_timeout: float = Field(15, alias="ELASTIC_KEEPALIVE_TIMEOUT")
+    # Узлы из sniffing должны быть доступны по своим publish_address
+    es_sniff_on_start: bool = Field(False, alias="ELASTIC_SNIFF_ON_START")
+    es_sniff_on_connection_fail: bool = Field(
+        False, alias="ELASTIC_SNIFF_ON_CONNECTION_FAIL"
+    )
+    es_sniffer_timeout: float | None = Field(None, alias="ELASTIC_SNIFFER_TIMEOUT")
 
     redis_host: str = Field("127.0.0.1", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
+    # При занятых соединениях запрос ждет свободное не дольше pool_timeout
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout: float = Field(5, alias="REDIS_POOL_TIMEOUT")
+    # Таймаут чтения запросов API, подписка на сброс кеша идет мимо пула
+    redis_socket_timeout: float = Field(2, alias="REDIS_SOCKET_TIMEOUT")
+    redis_socket_connect_timeout: float = Field(
+        2, alias="REDIS_SOCKET_CONNECT_TIMEOUT"
+    )
+    redis_health_check_interval: int = Field(30, alias="REDIS_HEALTH_CHECK_INTERVAL")
+
+    # Кеш сбрасывается по событиям ETL, поэтому TTL может быть длинным
+    cache_expire_in_seconds: int = Field(60 * 5, alias="CACHE_EXPIRE_IN_SECONDS")
+    cache_invalidation_channel: str = Field(
+        "cache_invalidation", alias="CACHE_INVALIDATION_CHANNEL"
+    )
+
+    # Межпроцессная блокировка при промахе кеша (несколько воркеров uvicorn)
+    cache_lock_enabled: bool = Field(False, alias="CACHE_LOCK_ENABLED")
+    cache_lock_timeout: float = Field(10, alias="CACHE_LOCK_TIMEOUT")
+    cache_lock_blocking_timeout: float = Field(5, alias="CACHE_LOCK_BLOCKING_TIMEOUT")
+
+    # Локальный кеш воркера перед Redis
+    local_cache_max_entries: int = Field(10000, alias="LOCAL_CACHE_MAX_ENTRIES")
+    local_cache_max_bytes: int = Field(64 * 1024 * 1024, alias="LOCAL_CACHE_MAX_BYTES")
+    local_cache_ttl: float = Field(30, alias="LOCAL_CACHE_TTL")
+    genres_local_cache_ttl: float = Field(300, alias="GENRES_LOCAL_CACHE_TTL")
+
+    # Время жизни кеша страниц списков и поиска, секунды
+    films_list_cache_ttl: int = Field(60, alias="FILMS_LIST_CACHE_TTL")
+    films_search_cache_ttl: int = Field(60, alias="FILMS_SEARCH_CACHE_TTL")
+    genres_list_cache_ttl: int = Field(60 * 5, alias="GENRES_LIST_CACHE_TTL")
+    persons_search_cache_ttl: int = Field(60, alias="PERSONS_SEARCH_CACHE_TTL")
+    person_films_cache_ttl: int = Field(60, alias="PERSON_FILMS_CACHE_TTL")
 
 
 settings = Settings()
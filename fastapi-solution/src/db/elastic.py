@@ -1,8 +1,89 @@
+import asyncio
+import time
+
 from typing import Optional
-from elasticsearch import AsyncElasticsearch
+
+import aiohttp
+
+from elasticsearch import AIOHttpConnection, AsyncElasticsearch
+from elasticsearch._async.http_aiohttp import ESClientResponse
+
+from db.pool_stats import PoolStats, get_pool_stats
 
 es: Optional[AsyncElasticsearch] = None
 
 
+class MeteredConnection(AIOHttpConnection):
+    """Соединение с узлом ES, которое считает ожидание свободного сокета.
+
+    aiohttp ставит запрос в очередь, когда заняты все maxsize соединений
+    узла, время в очереди попадает в счетчики пула. Таймаутом пула
+    считается таймаут запроса, который стоял в очереди.
+    """
+
+    def __init__(
+        self, *args, maxsize: int = 10, keepalive_timeout: float = 15, **kwargs
+    ):
+        super().__init__(*args, maxsize=maxsize, **kwargs)
+        self.keepalive_timeout = keepalive_timeout
+        self.stats: PoolStats = get_pool_stats(f"elastic:{self.host}", maxsize)
+
+    async def _create_aiohttp_session(self):
+        # Повторяет сессию клиента, добавляя keep-alive и трассировку пула
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            auto_decompress=True,
+            loop=self.loop,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            response_class=ESClientResponse,
+            connector=aiohttp.TCPConnector(
+                limit=self._limit,
+                use_dns_cache=True,
+                ssl=self._ssl_context,
+                keepalive_timeout=self.keepalive_timeout,
+            ),
+            trace_configs=[self._trace_config()],
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        stats = self.stats
+
+        async def on_request_start(session, ctx, params):
+            stats.acquired += 1
+            stats.in_use += 1
+
+        async def on_request_end(session, ctx, params):
+            stats.in_use -= 1
+
+        async def on_request_exception(session, ctx, params):
+            stats.in_use -= 1
+            if not hasattr(ctx, "queued_at"):
+                return
+            if not getattr(ctx, "dequeued", False):
+                # Таймаут истек, пока запрос стоял в очереди
+                await on_queued_end(session, ctx, params)
+            if isinstance(params.exception, asyncio.TimeoutError):
+                stats.timeouts += 1
+
+        async def on_queued_start(session, ctx, params):
+            stats.waiting += 1
+            ctx.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            ctx.dequeued = True
+            stats.waiting -= 1
+            stats.observe_wait(time.perf_counter() - ctx.queued_at)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        return trace_config
+
+
 async def get_elastic() -> AsyncElasticsearch:
     return es
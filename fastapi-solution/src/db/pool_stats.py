@@ -0,0 +1,44 @@
+class PoolStats:
+    """Счетчики пула соединений воркера.
+
+    Ожидание считается только для запросов, которым не хватило свободного
+    соединения. Доля таких запросов показывает насыщение пула.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_use = 0
+        self.acquired = 0
+        self.waiting = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.waited += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "acquired": self.acquired,
+            "waiting": self.waiting,
+            "waited": self.waited,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+            "timeouts": self.timeouts,
+            "saturation": self.waited / self.acquired if self.acquired else 0.0,
+        }
+
+
+pool_stats: dict[str, PoolStats] = {}
+
+
+def get_pool_stats(name: str, size: int) -> PoolStats:
+    """Возвращает счетчики пула по имени, создавая их при первом обращении."""
+    if name not in pool_stats:
+        pool_stats[name] = PoolStats(size)
+    return pool_stats[name]
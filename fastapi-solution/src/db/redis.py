@@ -1,7 +1,51 @@
-from redis.asyncio import Redis
+import time
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ConnectionError
+
+from db.pool_stats import PoolStats, get_pool_stats
 
 redis: Redis | None = None
 
 
+class MeteredConnectionPool(BlockingConnectionPool):
+    """Пул, который при нехватке соединений ждет и считает ожидание.
+
+    Запрос ждет, если в момент обращения свободных соединений нет.
+    Ошибка соединения после такого ожидания считается таймаутом пула.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats: PoolStats = get_pool_stats("redis", self.max_connections)
+
+    async def get_connection(self, command_name, *keys, **options):
+        self.stats.acquired += 1
+        saturated = self.pool.empty()
+        if saturated:
+            self.stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except ConnectionError:
+            if saturated:
+                self.stats.timeouts += 1
+            raise
+        finally:
+            if saturated:
+                self.stats.waiting -= 1
+                self.stats.observe_wait(time.perf_counter() - started)
+            self._update_in_use()
+        return connection
+
+    async def release(self, connection):
+        await super().release(connection)
+        self._update_in_use()
+
+    def _update_in_use(self) -> None:
+        # Свободные места очереди: простаивающие соединения и еще не созданные
+        self.stats.in_use = self.max_connections - self.pool.qsize()
+
+
 async def get_redis() -> Redis:
     return redis
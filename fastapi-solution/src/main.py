@@ -1,3 +1,4 @@
+import asyncio
 import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
@@ -5,18 +6,53 @@ from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
 from contextlib import asynccontextmanager
 
-from api.v1 import films, genres, persons
+from api.errors import exception_handlers
+from api.v1 import films, genres, metrics, persons
 from core.config import settings
 from db import elastic, redis
+from services.invalidation import listen_invalidations
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    redis.redis = Redis(
+        connection_pool=redis.MeteredConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+    )
     elastic.es = AsyncElasticsearch(
-        hosts=[f"{settings.es_host}:{settings.es_port}"]
+        hosts=[f"{settings.es_host}:{settings.es_port}"],
+        connection_class=elastic.MeteredConnection,
+        maxsize=settings.es_maxsize,
+        timeout=settings.es_timeout,
+        max_retries=settings.es_max_retries,
+        retry_on_timeout=settings.es_retry_on_timeout,
+        http_compress=settings.es_http_compress,
+        keepalive_timeout=settings.es_keepalive_timeout,
+        sniff_on_start=settings.es_sniff_on_start,
+        sniff_on_connection_fail=settings.es_sniff_on_connection_fail,
+        sniffer_timeout=settings.es_sniffer_timeout,
+    )
+    # Подписка подолгу ждет сообщений, таймаут чтения пула ей не подходит
+    subscriber = Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        socket_keepalive=True,
+    )
+    invalidation = asyncio.create_task(
+        listen_invalidations(subscriber, settings.cache_invalidation_channel)
     )
     yield
+    invalidation.cancel()
+    await subscriber.close()
     await redis.redis.close()
     await elastic.es.close()
 
@@ -29,12 +65,14 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
     version="1.0.0",
     lifespan = lifespan,
+    exception_handlers=exception_handlers,
 )
 
 
 app.include_router(films.router, prefix="/api/v1/films", tags=["Фильмы"])
 app.include_router(genres.router, prefix="/api/v1/genres", tags=["Жанры"])
 app.include_router(persons.router, prefix="/api/v1/persons", tags=["Персоны"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Метрики"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,7 +1,10 @@
 import orjson
 
+from typing import Generic, TypeVar
 from pydantic import BaseModel, Field
 
+T = TypeVar("T")
+
 
 def orjson_dumps(v, *, default):
     return orjson.dumps(v, default=default).decode()
@@ -14,3 +17,12 @@ class MyBaseModel(BaseModel):
         json_loads = orjson.loads
         json_dumps = orjson_dumps
         populate_by_name = True
+
+
+class BatchRequest(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
@@ -4,6 +4,9 @@ from models.base import MyBaseModel
 class Genre(MyBaseModel):
     name: str
     description: str | None = None
+    film_count: int = 0
+    avg_rating: float | None = None
+    top_film_ids: list[str] = []
 
 
 class GenreForFilm(MyBaseModel):
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+
+class LocalCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+
+class PoolStats(BaseModel):
+    size: int
+    in_use: int
+    acquired: int
+    waiting: int
+    waited: int
+    wait_seconds: float
+    max_wait_seconds: float
+    timeouts: int
+    saturation: float
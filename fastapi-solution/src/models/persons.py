@@ -20,4 +20,5 @@ class Person(MyBaseModel):
 
 class PersonWithFilms(MyBaseModel):
     full_name: str = Field()
-    films: list[FilmForPerson]
+    # Документы индекса до появления фильмографии не содержат films
+    films: list[FilmForPerson] = []
@@ -1,8 +1,57 @@
+import hashlib
+import orjson
+
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import NamedTuple, get_args
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from redis.asyncio import Redis
 from pydantic import BaseModel
 
+from core.config import settings
+from services.cursor import search_after_page
+from services.invalidation import page_keys_set
+from services.local_cache import get_local_cache
+from services.queries import full_text
+from services.single_flight import SingleFlight
+
+EMPTY_PAGE = b"[]"
+
+
+class CacheEntry(NamedTuple):
+    """Запись локального кеша: модель и ее JSON в публичном формате.
+
+    Модель может быть не построена, если запись пришла по быстрому пути.
+    """
+
+    obj: BaseModel | None
+    raw: bytes
+
+
+@lru_cache()
+def source_fields(model: type[BaseModel]) -> list[str]:
+    """Поля _source, из которых строится модель, с учетом вложенных моделей.
+
+    Модели заполняются и по псевдониму, и по имени поля, поэтому при
+    populate_by_name в выборку попадают оба варианта.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        es_names = [field.alias or name]
+        if field.alias and model.model_config.get("populate_by_name"):
+            es_names.append(name)
+        nested = [
+            arg
+            for arg in (field.annotation, *get_args(field.annotation))
+            if isinstance(arg, type) and issubclass(arg, BaseModel)
+        ]
+        for es_name in es_names:
+            if nested:
+                fields.extend(f"{es_name}.{sub}" for sub in source_fields(nested[0]))
+            else:
+                fields.append(es_name)
+    return fields
+
 
 class AbstractGetById(ABC):
     @abstractmethod
@@ -39,38 +88,164 @@ class BaseGetById(AbstractGetById):
     index_name = "example"
     model_get_by_id = BaseModel
     model_es_get_by_id = BaseModel
+    local_cache_max_entries = settings.local_cache_max_entries
+    local_cache_max_bytes = settings.local_cache_max_bytes
+    local_cache_expire_in_seconds = settings.local_cache_ttl
 
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self.local_cache = get_local_cache(
+            self.index_name,
+            self.local_cache_max_entries,
+            self.local_cache_max_bytes,
+            self.local_cache_expire_in_seconds,
+        )
+        self.single_flight = SingleFlight(
+            redis,
+            lock_enabled=settings.cache_lock_enabled,
+            lock_timeout=settings.cache_lock_timeout,
+            lock_blocking_timeout=settings.cache_lock_blocking_timeout,
+        )
 
     async def get_by_id(self, obj_id: str) -> BaseModel:
         obj = await self._get_obj_from_cache(obj_id)
         if not obj:
-            obj = await self._get_obj_from_elastic(obj_id)
-            if not obj:
-                return None
-            await self._put_obj_to_cache(obj)
+            obj = await self._load_obj_shared(obj_id)
         return obj
 
+    async def get_by_id_json(self, obj_id: str) -> bytes | None:
+        """Объект в формате ответа API.
+
+        В кеше объект уже лежит в публичном формате, поэтому при попадании
+        байты отдаются как есть, без построения и валидации модели.
+        """
+        key = self._cache_key(obj_id)
+        entry = self.local_cache.get(key)
+        if entry is not None:
+            return entry.raw
+        data = await self.redis.get(key)
+        if data:
+            self.local_cache.set(key, CacheEntry(None, data), len(data))
+            return data
+        obj = await self._load_obj_shared(obj_id)
+        if not obj:
+            return None
+        return obj.model_dump_json().encode()
+
+    async def _load_obj_shared(self, obj_id: str) -> BaseModel | None:
+        return await self.single_flight.do(
+            self._cache_key(obj_id),
+            lambda: self._load_obj(obj_id),
+            lambda: self._get_obj_from_cache(obj_id),
+        )
+
+    async def _load_obj(self, obj_id: str) -> BaseModel | None:
+        obj = await self._get_obj_from_elastic(obj_id)
+        if not obj:
+            return None
+        await self._put_obj_to_cache(obj)
+        return obj
+
+    async def get_many(self, obj_ids: list[str]) -> list[BaseModel | None]:
+        """Объекты в порядке запроса, None для ненайденных.
+
+        Попадания в Redis читаются одним MGET, промахи одним mget в ES.
+        """
+        found = {}
+        for obj_id in obj_ids:
+            obj = self._get_obj_from_local_cache(self._cache_key(obj_id))
+            if obj is not None:
+                found[obj_id] = obj
+        not_local = list(dict.fromkeys(i for i in obj_ids if i not in found))
+        if not_local:
+            found.update(await self._get_objs_from_cache(not_local))
+        misses = [i for i in not_local if i not in found]
+        if misses:
+            found.update(await self._load_objs(misses))
+        return [found.get(obj_id) for obj_id in obj_ids]
+
+    async def _load_objs(self, obj_ids: list[str]) -> dict[str, BaseModel]:
+        objs = await self._get_objs_from_elastic(obj_ids)
+        await self._put_objs_to_cache(list(objs.values()))
+        return objs
+
+    def _cache_key(self, obj_id: str) -> str:
+        return self.index_name + ":" + obj_id
+
     async def _get_obj_from_elastic(self, obj_id: str):
         try:
-            doc = await self.elastic.get(index=self.index_name, id=obj_id)
+            doc = await self.elastic.get(
+                index=self.index_name,
+                id=obj_id,
+                _source_includes=source_fields(self.model_es_get_by_id),
+            )
         except NotFoundError:
             return None
         return self.model_es_get_by_id(**doc["_source"])
 
+    async def _get_objs_from_elastic(self, obj_ids: list[str]) -> dict[str, BaseModel]:
+        response = await self.elastic.mget(
+            body={"ids": obj_ids},
+            index=self.index_name,
+            _source_includes=source_fields(self.model_es_get_by_id),
+        )
+        return {
+            doc["_id"]: self.model_es_get_by_id(**doc["_source"])
+            for doc in response["docs"]
+            if doc.get("found")
+        }
+
     async def _get_obj_from_cache(self, obj_id: str) -> BaseModel | None:
-        key = self.index_name + ":" + obj_id
+        key = self._cache_key(obj_id)
+        obj = self._get_obj_from_local_cache(key)
+        if obj is not None:
+            return obj
         data = await self.redis.get(key)
         if not data:
             return None
 
-        return self.model_get_by_id.model_validate_json(data)
+        obj = self.model_get_by_id.model_validate_json(data)
+        self.local_cache.set(key, CacheEntry(obj, data), len(data))
+        return obj
+
+    def _get_obj_from_local_cache(self, key: str) -> BaseModel | None:
+        entry = self.local_cache.get(key)
+        if entry is None:
+            return None
+        if entry.obj is None:
+            obj = self.model_get_by_id.model_validate_json(entry.raw)
+            self.local_cache.set(key, CacheEntry(obj, entry.raw), len(entry.raw))
+            return obj
+        return entry.obj
 
     async def _put_obj_to_cache(self, obj: BaseModel):
-        key = self.index_name + ":" + obj.uuid
-        await self.redis.set(key, obj.model_dump_json(), self.cache_expire_in_seconds)
+        key = self._cache_key(obj.uuid)
+        data = obj.model_dump_json().encode()
+        await self.redis.set(key, data, self.cache_expire_in_seconds)
+        self.local_cache.set(key, CacheEntry(obj, data), len(data))
+
+    async def _get_objs_from_cache(self, obj_ids: list[str]) -> dict[str, BaseModel]:
+        keys = [self._cache_key(obj_id) for obj_id in obj_ids]
+        result = {}
+        for obj_id, key, data in zip(obj_ids, keys, await self.redis.mget(keys)):
+            if not data:
+                continue
+            obj = self.model_get_by_id.model_validate_json(data)
+            self.local_cache.set(key, CacheEntry(obj, data), len(data))
+            result[obj_id] = obj
+        return result
+
+    async def _put_objs_to_cache(self, objs: list[BaseModel]):
+        if not objs:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for obj in objs:
+                key = self._cache_key(obj.uuid)
+                data = obj.model_dump_json().encode()
+                pipe.set(key, data, self.cache_expire_in_seconds)
+                self.local_cache.set(key, CacheEntry(obj, data), len(data))
+            await pipe.execute()
 
 
 class AbstractSearch(ABC):
@@ -103,7 +278,8 @@ class BaseSearch(AbstractSearch):
         self, query: str, page_size: int = 50, page_number: int = 1
     ) -> list[BaseModel]:
         query = {
-            "query": {"match": {self.search_field: query}},
+            **full_text(self.search_field, query),
+            "_source": source_fields(self.model_search),
             "size": page_size,
             "from": (page_number - 1) * page_size,
         }
@@ -111,6 +287,22 @@ class BaseSearch(AbstractSearch):
         data = response["hits"]["hits"]
         return [self.model_search(**i["_source"]) for i in data]
 
+    async def search_cursor(
+        self, query: str, page_size: int = 50, cursor: str | None = None
+    ) -> tuple[list[BaseModel], str | None]:
+        data, next_cursor = await search_after_page(
+            self.elastic,
+            self.index_name,
+            {
+                **full_text(self.search_field, query),
+                "_source": source_fields(self.model_search),
+            },
+            [{"_score": "desc"}, {"id": "asc"}],
+            page_size,
+            cursor,
+        )
+        return [self.model_search(**i["_source"]) for i in data], next_cursor
+
 
 class AbstractGetAll(ABC):
     @abstractmethod
@@ -136,7 +328,57 @@ class BaseGetAll(AbstractGetAll):
     async def get_all(
         self, page_size: int = 50, page_number: int = 1
     ) -> list[BaseModel]:
-        query = {"size": page_size, "from": (page_number - 1) * page_size}
+        query = {
+            "_source": source_fields(self.model_get_all),
+            "size": page_size,
+            "from": (page_number - 1) * page_size,
+        }
         response = await self.elastic.search(index=self.index_name, body=query)
         data = response["hits"]["hits"]
         return [self.model_get_all(**i["_source"]) for i in data]
+
+
+class BasePageCache:
+    """Кеширует сериализованные страницы списков и поиска в Redis.
+
+    Ключ строится из индекса, метода сервиса и нормализованных параметров,
+    при попадании возвращаются готовые байты JSON без валидации моделей.
+    """
+
+    page_cache_expire_in_seconds: dict[str, int] = {}
+    page_cache_depends_on: tuple[str, ...] = ()
+
+    async def get_page(self, method: str, **params) -> bytes:
+        key = self._page_cache_key(method, self._normalize_page_params(params))
+        data = await self.redis.get(key)
+        if data:
+            return data
+        page = await getattr(self, method)(**params)
+        data = orjson.dumps([obj.model_dump(mode="json") for obj in page])
+        # Множество страниц живет не меньше самой долгой страницы сервиса
+        pages_expire = max(self.page_cache_expire_in_seconds.values())
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, data, self.page_cache_expire_in_seconds[method])
+            for index in self.page_cache_depends_on or (self.index_name,):
+                pipe.sadd(page_keys_set(index), key)
+                pipe.expire(page_keys_set(index), pages_expire)
+            await pipe.execute()
+        return data
+
+    def _normalize_page_params(self, params: dict) -> dict:
+        normalized = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = " ".join(value.split())
+                if name == "query":
+                    value = value.lower()
+            normalized[name] = value
+        return normalized
+
+    def _page_cache_key(self, method: str, params: dict) -> str:
+        params_hash = hashlib.md5(
+            orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+        return f"page:{self.index_name}:{method}:{params_hash}"
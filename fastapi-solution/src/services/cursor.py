@@ -0,0 +1,153 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from typing import AsyncIterator
+
+from elasticsearch import (
+    AsyncElasticsearch,
+    NotFoundError,
+    RequestError,
+    TransportError,
+)
+
+PIT_KEEP_ALIVE = "1m"
+
+
+class InvalidCursorError(Exception):
+    """Курсор поврежден или выдан для другого запроса."""
+
+
+class PitUnavailableError(Exception):
+    """ES не открыл point-in-time: нет индекса или исчерпан лимит контекстов."""
+
+
+def query_fingerprint(index: str, body: dict, sort: list) -> str:
+    """Отпечаток запроса и сортировки, для которых выдан курсор."""
+    data = json.dumps([index, body, sort], sort_keys=True)
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+def encode_cursor(search_after: list, fingerprint: str) -> str:
+    # json, а не orjson: значения сортировки могут быть бесконечностями
+    data = json.dumps({"after": search_after, "query": fingerprint})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[list, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data["after"], data["query"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError(cursor)
+
+
+async def open_pit(elastic: AsyncElasticsearch, index: str) -> str:
+    try:
+        response = await elastic.transport.perform_request(
+            "POST", f"/{index}/_pit", params={"keep_alive": PIT_KEEP_ALIVE}
+        )
+    except TransportError as error:
+        raise PitUnavailableError(index) from error
+    return response["id"]
+
+
+async def close_pit(elastic: AsyncElasticsearch, pit_id: str) -> None:
+    try:
+        await elastic.transport.perform_request("DELETE", "/_pit", body={"id": pit_id})
+    except NotFoundError:
+        pass
+
+
+async def search_after_page(
+    elastic: AsyncElasticsearch,
+    index: str,
+    body: dict,
+    sort: list,
+    page_size: int,
+    cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """Страница результатов по курсору search_after.
+
+    Сортировка заканчивается на id, поэтому порядок полный и страницы не
+    пересекаются без point-in-time. Курсор принимается только с тем же
+    запросом и сортировкой. Возвращает хиты и курсор следующей страницы,
+    на последней он None.
+    """
+    fingerprint = query_fingerprint(index, body, sort)
+    body = {**body, "size": page_size, "sort": sort}
+    if cursor:
+        search_after, cursor_fingerprint = decode_cursor(cursor)
+        if cursor_fingerprint != fingerprint:
+            raise InvalidCursorError(cursor)
+        body["search_after"] = search_after
+    try:
+        response = await elastic.search(index=index, body=body)
+    except RequestError:
+        if cursor:
+            raise InvalidCursorError(cursor)
+        raise
+    hits = response["hits"]["hits"]
+    if len(hits) < page_size:
+        return hits, None
+    return hits, encode_cursor(hits[-1]["sort"], fingerprint)
+
+
+async def pit_page(
+    elastic: AsyncElasticsearch,
+    pit_id: str,
+    body: dict,
+    page_size: int,
+    search_after: list | None = None,
+) -> dict:
+    page = {
+        **body,
+        "size": page_size,
+        "sort": [{"_shard_doc": "asc"}],
+        "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+    }
+    if search_after:
+        page["search_after"] = search_after
+    return await elastic.search(body=page)
+
+
+async def open_pit_pages(
+    elastic: AsyncElasticsearch, index: str, body: dict, page_size: int
+) -> AsyncIterator[list[dict]]:
+    """Открывает point-in-time и читает первую страницу всего индекса.
+
+    Ошибки ES всплывают здесь, до начала потокового ответа. Возвращает
+    итератор по страницам, который закрывает PIT по завершении.
+    """
+    pit_id = await open_pit(elastic, index)
+    try:
+        response = await pit_page(elastic, pit_id, body, page_size)
+    except Exception:
+        await close_pit(elastic, pit_id)
+        raise
+    return iterate_pit_pages(elastic, body, page_size, response)
+
+
+async def iterate_pit_pages(
+    elastic: AsyncElasticsearch, body: dict, page_size: int, response: dict
+) -> AsyncIterator[list[dict]]:
+    """Проходит весь индекс страницами внутри одного point-in-time.
+
+    Следующая страница запрашивается, только когда потребитель забрал
+    предыдущую, поэтому в памяти всегда не больше одной страницы.
+    """
+    pit_id = response["pit_id"]
+    try:
+        while True:
+            hits = response["hits"]["hits"]
+            if hits:
+                yield hits
+            if len(hits) < page_size:
+                return
+            response = await pit_page(
+                elastic, pit_id, body, page_size, hits[-1]["sort"]
+            )
+            pit_id = response.get("pit_id", pit_id)
+    finally:
+        await close_pit(elastic, pit_id)
@@ -1,71 +1,121 @@
+import orjson
+
 from functools import lru_cache
+from typing import AsyncIterator
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from redis.asyncio import Redis
 
+from core.config import settings
 from db.elastic import get_elastic
 from db.redis import get_redis
 from models.films import Film, FilmBase
-from services.base import BaseGetById, BaseSearch, BaseGetAll
+from services.base import (
+    BaseGetById,
+    BaseSearch,
+    BaseGetAll,
+    BasePageCache,
+    source_fields,
+)
+from services.cursor import open_pit_pages, search_after_page
+from services.queries import films_query
 
 
-class FilmService(BaseGetById, BaseSearch, BaseGetAll):
-    cache_expire_in_seconds = 60 * 5
+class FilmService(BaseGetById, BaseSearch, BaseGetAll, BasePageCache):
+    cache_expire_in_seconds = settings.cache_expire_in_seconds
     index_name = "movies"
     model_get_by_id = Film
     model_es_get_by_id = Film
     model_search = FilmBase
     search_field = "title"
     model_get_all = FilmBase
+    page_cache_expire_in_seconds = {
+        "get_all": settings.films_list_cache_ttl,
+        "search": settings.films_search_cache_ttl,
+    }
+    export_page_size = 1000
 
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = redis
-        self.elastic = elastic
+        super().__init__(redis, elastic)
 
     async def get_all(
         self,
         genre: str | None = None,
+        person: str | None = None,
         sort: str = "-imdb_rating",
         page_size: int = 50,
         page_number: int = 1,
     ) -> list[FilmBase]:
-        if "+" in sort:
-            sort = sort[1:]
-            sort_type = "asc"
-        elif "-" in sort:
-            sort = sort[1:]
-            sort_type = "desc"
-        else:
-            sort_type = "desc"
-        if genre is None:
-            query = {
-                "size": page_size,
-                "from": (page_number - 1) * page_size,
-                "sort": [{sort: sort_type}],
-            }
-        else:
-            query = {
-                "query": {
-                    "bool": {
-                        "should": [
-                            {
-                                "nested": {
-                                    "path": "genres",
-                                    "query": {"match": {"genres.id": genre}},
-                                }
-                            },
-                        ]
-                    }
-                },
-                "size": page_size,
-                "from": (page_number - 1) * page_size,
-                "sort": [{sort: sort_type}],
-            }
+        sort, sort_type = self._parse_sort(sort)
+        query = {
+            **films_query(genre, person),
+            "_source": source_fields(FilmBase),
+            "size": page_size,
+            "from": (page_number - 1) * page_size,
+            "sort": [{sort: sort_type}],
+        }
         response = await self.elastic.search(index=self.index_name, body=query)
         data = response["hits"]["hits"]
         return [FilmBase(**i["_source"]) for i in data]
 
+    async def get_all_cursor(
+        self,
+        genre: str | None = None,
+        person: str | None = None,
+        sort: str = "-imdb_rating",
+        page_size: int = 50,
+        cursor: str | None = None,
+    ) -> tuple[list[FilmBase], str | None]:
+        sort, sort_type = self._parse_sort(sort)
+        data, next_cursor = await search_after_page(
+            self.elastic,
+            self.index_name,
+            {**films_query(genre, person), "_source": source_fields(FilmBase)},
+            [{sort: sort_type}, {"id": "asc"}],
+            page_size,
+            cursor,
+        )
+        return [FilmBase(**i["_source"]) for i in data], next_cursor
+
+    async def export(
+        self,
+        genre: str | None = None,
+        person: str | None = None,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Документы индекса в формате NDJSON, по одному куску на страницу.
+
+        Первая страница читается сразу, чтобы ошибки ES дошли до клиента
+        статусом ответа, а не обрывом уже начатого потока.
+        """
+        body = films_query(genre, person)
+        if fields:
+            body["_source"] = ["id", *fields]
+        pages = await open_pit_pages(
+            self.elastic, self.index_name, body, self.export_page_size
+        )
+        return self._ndjson(pages)
+
+    @staticmethod
+    async def _ndjson(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+        async for hits in pages:
+            yield b"".join(orjson.dumps(hit["_source"]) + b"\n" for hit in hits)
+
+    @staticmethod
+    def _parse_sort(sort: str) -> tuple[str, str]:
+        if "+" in sort:
+            return sort[1:], "asc"
+        if "-" in sort:
+            return sort[1:], "desc"
+        return sort, "desc"
+
+    def _normalize_page_params(self, params: dict) -> dict:
+        normalized = super()._normalize_page_params(params)
+        if "sort" in normalized:
+            normalized["sort"] = ":".join(self._parse_sort(normalized["sort"]))
+        return normalized
+
 
 @lru_cache()
 def get_film_service(
@@ -4,22 +4,24 @@ from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from redis.asyncio import Redis
 
+from core.config import settings
 from db.elastic import get_elastic
 from db.redis import get_redis
 from models.genres import Genre
-from services.base import BaseGetById, BaseGetAll
+from services.base import BaseGetById, BaseGetAll, BasePageCache
 
 
-class GenreService(BaseGetById, BaseGetAll):
-    cache_expire_in_seconds = 60 * 5
+class GenreService(BaseGetById, BaseGetAll, BasePageCache):
+    cache_expire_in_seconds = settings.cache_expire_in_seconds
     index_name = "genres"
     model_get_by_id = Genre
     model_es_get_by_id = Genre
     model_get_all = Genre
+    local_cache_expire_in_seconds = settings.genres_local_cache_ttl
+    page_cache_expire_in_seconds = {"get_all": settings.genres_list_cache_ttl}
 
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = redis
-        self.elastic = elastic
+        super().__init__(redis, elastic)
 
 
 @lru_cache()
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError
+
+from services.local_cache import local_caches
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 5
+
+
+def page_keys_set(index: str) -> str:
+    """Ключ множества закешированных страниц, зависящих от индекса."""
+    return "pages:" + index
+
+
+def invalidate(index: str, ids: list[str]) -> None:
+    """Удаляет документы индекса из кеша в памяти воркера.
+
+    Ключи и страницы в Redis удаляет сам ETL до публикации события.
+    """
+    local_cache = local_caches.get(index)
+    if local_cache is None:
+        return
+    for obj_id in ids:
+        local_cache.delete(index + ":" + obj_id)
+
+
+def reset(index: str) -> None:
+    """Очищает кеш индекса в памяти воркера после пересборки индекса."""
+    local_cache = local_caches.get(index)
+    if local_cache is not None:
+        local_cache.clear()
+
+
+async def listen_invalidations(subscriber: Redis, channel: str) -> None:
+    """Слушает канал ETL и сбрасывает кеш воркера по переиндексированным id.
+
+    Канал читается через subscriber без таймаута чтения. Пока соединения
+    не было, события могли потеряться, поэтому после переподключения
+    локальные кеши очищаются целиком.
+    """
+    while True:
+        pubsub = subscriber.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    event = orjson.loads(message["data"])
+                    if event.get("reset"):
+                        reset(event["index"])
+                    else:
+                        invalidate(event["index"], event["ids"])
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    logger.warning("Некорректное событие сброса кеша: %s", message)
+        except ConnectionError:
+            logger.warning("Нет соединения с Redis, переподключение")
+            await asyncio.sleep(RECONNECT_DELAY)
+            for cache in local_caches.values():
+                cache.clear()
+        finally:
+            await pubsub.close()
@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LocalCache:
+    """LRU-кеш в памяти воркера с ограничением по записям, объему и TTL.
+
+    Объем считается по размеру сериализованного JSON объекта, это оценка,
+    а не точный расход памяти.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expire_at, _, value = item
+        if expire_at < time.monotonic():
+            self._pop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._pop(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self.bytes += size
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            self._pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        if key in self._data:
+            self._pop(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _pop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+
+local_caches: dict[str, LocalCache] = {}
+
+
+def get_local_cache(
+    name: str, max_entries: int, max_bytes: int, ttl: float
+) -> LocalCache:
+    """Возвращает кеш воркера по имени, создавая его при первом обращении."""
+    if name not in local_caches:
+        local_caches[name] = LocalCache(max_entries, max_bytes, ttl)
+    return local_caches[name]
@@ -0,0 +1,44 @@
+"""Построение запросов к ES.
+
+Ограничения по id идут в контекст фильтра: ES не считает для них
+релевантность и кеширует результат. Скоринг остается только у
+полнотекстового поиска.
+"""
+
+
+def term(field: str, value: str) -> dict:
+    return {"term": {field: value}}
+
+
+def filtered(*filters: dict | None) -> dict:
+    """Тело запроса из условий фильтра, пустые условия пропускаются.
+
+    Без условий возвращает пустое тело, то есть все документы индекса.
+    """
+    filters = [i for i in filters if i]
+    if not filters:
+        return {}
+    return {"query": {"bool": {"filter": filters}}}
+
+
+def full_text(field: str, text: str) -> dict:
+    """Тело полнотекстового поиска с подсчетом релевантности."""
+    return {"query": {"match": {field: text}}}
+
+
+def film_genre_filter(genre: str | None) -> dict | None:
+    if genre is None:
+        return None
+    return term("genre_ids", genre)
+
+
+def film_person_filter(person: str | None) -> dict | None:
+    """Фильмы, где персона участвует в любой роли."""
+    if person is None:
+        return None
+    return term("person_ids", person)
+
+
+def films_query(genre: str | None = None, person: str | None = None) -> dict:
+    """Фильмы по жанру и персоне, условия объединяются через И."""
+    return filtered(film_genre_filter(genre), film_person_filter(person))
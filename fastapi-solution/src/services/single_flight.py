@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Объединяет одновременные промахи кеша по одному ключу.
+
+    Внутри процесса конкурентные вызовы с одинаковым ключом ждут одну
+    общую задачу. В режиме redis-блокировки задача дополнительно берет
+    блокировку в Redis, чтобы один ключ загружал только один воркер.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        lock_enabled: bool = False,
+        lock_timeout: float = 10,
+        lock_blocking_timeout: float = 5,
+    ):
+        self.redis = redis
+        self.lock_enabled = lock_enabled
+        self.lock_timeout = lock_timeout
+        self.lock_blocking_timeout = lock_blocking_timeout
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        cached: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """Выполняет load один раз на ключ для всех ожидающих.
+
+        cached перечитывает кеш после получения redis-блокировки: пока
+        воркер ждал, значение мог положить другой процесс.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._call(key, load, cached))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def _call(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        cached: Callable[[], Awaitable[Any]] | None,
+    ) -> Any:
+        if not self.lock_enabled or self.redis is None:
+            return await load()
+        lock = self.redis.lock(
+            "lock:" + key,
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_blocking_timeout,
+        )
+        try:
+            acquired = await lock.acquire()
+        except LockError:
+            acquired = False
+        if not acquired:
+            logger.warning("Не удалось получить блокировку %s", key)
+        try:
+            if cached is not None:
+                obj = await cached()
+                if obj:
+                    return obj
+            return await load()
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except LockError:
+                    logger.warning("Блокировка %s истекла до освобождения", key)
@@ -5,6 +5,7 @@ import pytest_asyncio
 import os
 import uuid
 
+from http import HTTPStatus
 from aiohttp import ClientSession, RequestInfo
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import async_bulk
@@ -13,6 +14,20 @@ from redis.asyncio import Redis
 from tests.functional.settings import test_settings
 
 
+FLAT_ID_FIELDS = ["genre_ids", "actor_ids", "writer_ids", "director_ids", "person_ids"]
+
+
+def add_flat_ids(film: dict) -> dict:
+    """Плоские массивы id фильма, как их строит ETL."""
+    film["genre_ids"] = [i["id"] for i in film["genres"]]
+    for role in ["actor", "writer", "director"]:
+        film[f"{role}_ids"] = [i["id"] for i in film[f"{role}s"]]
+    film["person_ids"] = list(
+        dict.fromkeys(film["actor_ids"] + film["writer_ids"] + film["director_ids"])
+    )
+    return film
+
+
 async def list_in_parts(data: list):
     len_data = len(data)
     end = False
@@ -100,6 +115,38 @@ def make_get_request(http_session: ClientSession):
     return inner
 
 
+@pytest_asyncio.fixture
+def walk_cursor(make_get_request):
+    async def inner(path: str, params: dict) -> list[dict]:
+        """Проходит все страницы по курсору и возвращает их элементы."""
+        items, cursor = [], None
+        while True:
+            page_params = {**params, "cursor": cursor} if cursor else params
+            body, headers, status = await make_get_request(path, page_params)
+            assert status == HTTPStatus.OK
+            assert len(body["items"]) <= params["page_size"]
+            items.extend(body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return items
+
+    return inner
+
+
+@pytest_asyncio.fixture
+def make_post_request(http_session: ClientSession):
+    async def inner(path: str, json_body: dict) -> RequestInfo:
+        api_path = "api/v1/"
+        url = os.path.join(test_settings.service_url, api_path, path)
+        async with http_session.post(url, json=json_body) as response:
+            body = await response.json(content_type=None)
+            headers = response.headers
+            status = response.status
+        return body, headers, status
+
+    return inner
+
+
 @pytest_asyncio.fixture
 def get_from_redis(redis_client: Redis):
     async def inner(key: str) -> dict:
@@ -148,15 +195,23 @@ def generate_films():
             }
             for _ in range(n)
         ]
-        return es_data
+        return [add_flat_ids(film) for film in es_data]
 
     return inner
 
 
+@pytest.fixture
+def make_flat_ids():
+    return add_flat_ids
+
+
 @pytest.fixture
 def make_normal_names():
     def inner(body: dict) -> dict:
         body["uuid"] = body.pop("id")
+        # Плоские массивы id нужны только фильтрам и в ответ не попадают
+        for field in FLAT_ID_FIELDS:
+            body.pop(field, None)
         for field in ["directors_names", "actors_names", "writers_names"]:
             if field in body:
                 body.pop(field)
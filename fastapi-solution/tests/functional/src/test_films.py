@@ -1,3 +1,5 @@
+import json
+import os
 import uuid
 import pytest
 
@@ -20,6 +22,7 @@ async def test_search(
     es_write_data,
     make_get_request,
     es_clearing,
+    redis_clearing,
     query_data,
     expected_answer,
 ):
@@ -50,9 +53,10 @@ async def test_search(
             single_movie["uuid"] = single_movie.pop("id")
             assert body[0] == single_movie
 
-    # 5. Удаляем индекс
+    # 5. Удаляем индекс и закешированные страницы
     finally:
         await es_clearing(movie_index_name)
+        await redis_clearing()
 
 
 @pytest.mark.parametrize(
@@ -67,6 +71,7 @@ async def test_all_films(
     es_write_data,
     make_get_request,
     es_clearing,
+    redis_clearing,
     query_data,
     expected_answer,
 ):
@@ -85,6 +90,45 @@ async def test_all_films(
 
     finally:
         await es_clearing(movie_index_name)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_all_films_page_cache(
+    generate_films,
+    es_write_data,
+    make_get_request,
+    es_clearing,
+    redis_client,
+    redis_clearing,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    await es_write_data(movie_index_name, generate_films(10))
+
+    try:
+        body, headers, status = await make_get_request(
+            "films/", {"sort": "-imdb_rating", "page_size": 5}
+        )
+        assert status == HTTPStatus.OK
+        keys = await redis_client.keys(f"page:{movie_index_name}:get_all:*")
+        assert len(keys) == 1
+        assert await redis_client.smembers(f"pages:{movie_index_name}") == set(keys)
+
+        # Без индекса ответ может прийти только из кеша страниц,
+        # сортировка без знака означает ту же сортировку по убыванию
+        await es_clearing(movie_index_name)
+        cached_body, headers, status = await make_get_request(
+            "films/", {"sort": "imdb_rating", "page_size": 5}
+        )
+        assert status == HTTPStatus.OK
+        assert cached_body == body
+        assert await redis_client.keys(f"page:{movie_index_name}:*") == keys
+
+    finally:
+        await es_clearing(movie_index_name)
+        await redis_clearing()
 
 
 @pytest.mark.parametrize(
@@ -140,3 +184,190 @@ async def test_single_film(
     finally:
         await es_clearing(movie_index_name)
         await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_films_batch(
+    generate_films,
+    es_write_data,
+    make_post_request,
+    es_clearing,
+    redis_clearing,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    es_data = generate_films(3)
+    missing_uuid = str(uuid.uuid4())
+    request_ids = [es_data[2]["id"], missing_uuid, es_data[0]["id"]]
+
+    try:
+        await es_write_data(movie_index_name, es_data)
+
+        body, headers, status = await make_post_request(
+            "films/batch", {"ids": request_ids}
+        )
+
+        # Порядок ответа совпадает с запросом, ненайденный фильм равен null
+        assert status == HTTPStatus.OK
+        assert [film and film["uuid"] for film in body] == [
+            es_data[2]["id"],
+            None,
+            es_data[0]["id"],
+        ]
+
+    finally:
+        await es_clearing(movie_index_name)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_all_films_filter_by_genre_and_person(
+    generate_films,
+    make_flat_ids,
+    es_write_data,
+    make_get_request,
+    es_clearing,
+    redis_clearing,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    es_data = generate_films(3)
+    genre = es_data[0]["genres"][0]
+    person_uuid = str(uuid.uuid4())
+    # Первый фильм подходит по обоим условиям, второй только по жанру
+    es_data[0]["actors"].append({"id": person_uuid, "name": "Alex"})
+    es_data[1]["genres"] = [genre]
+    es_data[2]["writers"].append({"id": person_uuid, "name": "Alex"})
+    es_data = [make_flat_ids(film) for film in es_data]
+
+    try:
+        await es_write_data(movie_index_name, es_data)
+
+        body, headers, status = await make_get_request(
+            "films/", {"genre": genre["id"], "person": person_uuid}
+        )
+
+        assert status == HTTPStatus.OK
+        assert [film["uuid"] for film in body] == [es_data[0]["id"]]
+
+    finally:
+        await es_clearing(movie_index_name)
+        await redis_clearing()
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("films/cursor", {"page_size": 3}),
+        ("films/search/cursor", {"query": "The Star", "page_size": 3}),
+    ],
+)
+@pytest.mark.asyncio
+async def test_films_cursor(
+    generate_films,
+    es_write_data,
+    walk_cursor,
+    es_clearing,
+    redis_clearing,
+    path,
+    params,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    es_data = generate_films(10)
+    # Разные рейтинги, чтобы порядок не зависел от id
+    for rating, film in enumerate(es_data):
+        film["imdb_rating"] = float(rating)
+
+    try:
+        await es_write_data(movie_index_name, es_data)
+
+        items = await walk_cursor(path, params)
+
+        assert sorted(film["uuid"] for film in items) == sorted(
+            film["id"] for film in es_data
+        )
+        if path == "films/cursor":
+            ratings = [film["imdb_rating"] for film in items]
+            assert ratings == sorted(ratings, reverse=True)
+
+    finally:
+        await es_clearing(movie_index_name)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_films_cursor_other_query(
+    generate_films,
+    es_write_data,
+    make_get_request,
+    es_clearing,
+    redis_clearing,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    try:
+        await es_write_data(movie_index_name, generate_films(5))
+
+        body, headers, status = await make_get_request("films/cursor", {"page_size": 2})
+        assert status == HTTPStatus.OK
+
+        # Курсор выдан для другой сортировки
+        body, headers, status = await make_get_request(
+            "films/cursor",
+            {"page_size": 2, "sort": "+imdb_rating", "cursor": body["next_cursor"]},
+        )
+        assert status == HTTPStatus.BAD_REQUEST
+
+    finally:
+        await es_clearing(movie_index_name)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_films_export(
+    generate_films,
+    make_flat_ids,
+    es_write_data,
+    http_session,
+    es_clearing,
+):
+
+    movie_index_name = test_settings.es_index_movie
+
+    es_data = generate_films(5)
+    genre = {"id": str(uuid.uuid4()), "name": "Comedy"}
+    es_data[0]["genres"] = [genre]
+    es_data[1]["genres"] = [genre]
+    es_data = [make_flat_ids(film) for film in es_data]
+    url = os.path.join(test_settings.service_url, "api/v1/films/export")
+
+    try:
+        await es_write_data(movie_index_name, es_data)
+
+        async with http_session.get(url) as response:
+            assert response.status == HTTPStatus.OK
+            assert response.content_type == "application/x-ndjson"
+            rows = [json.loads(line) for line in (await response.text()).splitlines()]
+        assert sorted(row["id"] for row in rows) == sorted(
+            film["id"] for film in es_data
+        )
+
+        params = {"genre": genre["id"], "fields": "title,imdb_rating"}
+        async with http_session.get(url, params=params) as response:
+            assert response.status == HTTPStatus.OK
+            rows = [json.loads(line) for line in (await response.text()).splitlines()]
+        assert sorted(rows, key=lambda row: row["id"]) == sorted(
+            (
+                {"id": film["id"], "title": "The Star", "imdb_rating": 8.5}
+                for film in es_data[:2]
+            ),
+            key=lambda row: row["id"],
+        )
+
+    finally:
+        await es_clearing(movie_index_name)
@@ -7,11 +7,21 @@ from tests.functional.settings import test_settings
 
 
 @pytest.mark.asyncio
-async def test_genre_get_by_id(es_write_data, es_clearing, make_get_request):
+async def test_genre_get_by_id(
+    es_write_data, es_clearing, make_get_request, redis_clearing
+):
     index = test_settings.es_index_genre
     test_uuid = str(uuid.uuid4())
+    top_film_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
     genre_es_data = [
-        {"id": test_uuid, "name": "Action", "description": "Action movies"}
+        {
+            "id": test_uuid,
+            "name": "Action",
+            "description": "Action movies",
+            "film_count": 2,
+            "avg_rating": 7.5,
+            "top_film_ids": top_film_ids,
+        }
     ]
 
     await es_write_data(index, genre_es_data)
@@ -20,32 +30,68 @@ async def test_genre_get_by_id(es_write_data, es_clearing, make_get_request):
         "uuid": test_uuid,
         "name": "Action",
         "description": "Action movies",
+        "film_count": 2,
+        "avg_rating": 7.5,
+        "top_film_ids": top_film_ids,
     }
     try:
         assert status == HTTPStatus.OK
         assert body == expected_body
     finally:
         await es_clearing(index)
+        await redis_clearing()
 
 
 @pytest.mark.asyncio
-async def test_genre_get_all(es_write_data, es_clearing, make_get_request):
+async def test_genre_get_all(
+    es_write_data, es_clearing, make_get_request, redis_clearing
+):
     index = test_settings.es_index_genre
     test_uuid1 = str(uuid.uuid4())
     test_uuid2 = str(uuid.uuid4())
+    film_uuid = str(uuid.uuid4())
     genre_es_data = [
-        {"id": test_uuid1, "name": "Action", "description": "Action movies"},
-        {"id": test_uuid2, "name": "Drama", "description": "Drama movies"},
+        {
+            "id": test_uuid1,
+            "name": "Action",
+            "description": "Action movies",
+            "film_count": 1,
+            "avg_rating": 8.5,
+            "top_film_ids": [film_uuid],
+        },
+        {
+            "id": test_uuid2,
+            "name": "Drama",
+            "description": "Drama movies",
+            "film_count": 0,
+            "avg_rating": None,
+            "top_film_ids": [],
+        },
     ]
 
     await es_write_data(index, genre_es_data)
     body, headers, status = await make_get_request("genres")
     expected_body = [
-        {"uuid": test_uuid1, "name": "Action", "description": "Action movies"},
-        {"uuid": test_uuid2, "name": "Drama", "description": "Drama movies"},
+        {
+            "uuid": test_uuid1,
+            "name": "Action",
+            "description": "Action movies",
+            "film_count": 1,
+            "avg_rating": 8.5,
+            "top_film_ids": [film_uuid],
+        },
+        {
+            "uuid": test_uuid2,
+            "name": "Drama",
+            "description": "Drama movies",
+            "film_count": 0,
+            "avg_rating": None,
+            "top_film_ids": [],
+        },
     ]
     try:
         assert status == HTTPStatus.OK
         assert body == expected_body
     finally:
         await es_clearing(index)
+        await redis_clearing()
@@ -7,37 +7,20 @@ from tests.functional.settings import test_settings
 
 
 @pytest.mark.asyncio
-async def test_person_search(es_write_data, es_clearing, make_get_request):
+async def test_person_search(
+    es_write_data, es_clearing, make_get_request, redis_clearing
+):
     index = test_settings.es_index_person
     test_uuid = str(uuid.uuid4())
-    person_es_data = [{"id": test_uuid, "full_name": "Alex Gate"}]
     uuid_film_list = (str(uuid.uuid4()), str(uuid.uuid4()))
-    film_es_data = [
+    person_es_data = [
         {
-            "id": i,
-            "imdb_rating": 8.5,
-            "creation_date": "2020-01-01",
-            "genres": [{"id": str(uuid.uuid4()), "name": "Action"}],
-            "title": "The Star",
-            "description": "New World",
-            "directors_names": ["Stan"],
-            "actors_names": ["Ann", "Bob"],
-            "writers_names": ["Ben", "Howard"],
-            "actors": [
-                {"id": test_uuid, "name": "Alex Gate"},
-            ],
-            "writers": [
-                {"id": test_uuid, "name": "Alex Gate"},
-            ],
-            "directors": [
-                {"id": "caf76c67-c0fe-477e-8766-3ab3ff2574b5", "name": "Ben"},
-                {"id": "b45bd7bc-2e16-46d5-b125-983d356768c6", "name": "Howard"},
-            ],
+            "id": test_uuid,
+            "full_name": "Alex Gate",
+            "films": [{"id": i, "roles": ["actor", "writer"]} for i in uuid_film_list],
         }
-        for i in uuid_film_list
     ]
 
-    await es_write_data(test_settings.es_index_movie, film_es_data)
     await es_write_data(index, person_es_data)
     body, headers, status = await make_get_request("persons/search", {"query": "alex"})
     expected_body = [
@@ -54,7 +37,37 @@ async def test_person_search(es_write_data, es_clearing, make_get_request):
         assert body == expected_body
     finally:
         await es_clearing(index)
-        await es_clearing(test_settings.es_index_movie)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_person_search_page_cache(
+    es_write_data, es_clearing, make_get_request, redis_client, redis_clearing
+):
+    index = test_settings.es_index_person
+    person_es_data = [{"id": str(uuid.uuid4()), "full_name": "Alex Gate", "films": []}]
+
+    await es_write_data(index, person_es_data)
+    try:
+        body, headers, status = await make_get_request(
+            "persons/search", {"query": "Alex"}
+        )
+        assert status == HTTPStatus.OK
+        keys = await redis_client.keys(f"page:{index}:search:*")
+        assert len(keys) == 1
+        # Фильмография персоны строится из фильмов, страница зависит от обоих
+        for depends_on in (index, test_settings.es_index_movie):
+            assert await redis_client.smembers(f"pages:{depends_on}") == set(keys)
+
+        await es_clearing(index)
+        cached_body, headers, status = await make_get_request(
+            "persons/search", {"query": "  alex "}
+        )
+        assert status == HTTPStatus.OK
+        assert cached_body == body
+    finally:
+        await es_clearing(index)
+        await redis_clearing()
 
 
 @pytest.mark.asyncio
@@ -64,13 +77,11 @@ async def test_person_get_by_id(
     make_get_request,
     get_from_redis,
     redis_clearing,
-    generate_films,
 ):
     index = test_settings.es_index_person
     test_uuid = str(uuid.uuid4())
-    data = [{"id": test_uuid, "full_name": "Alex Gate"}]
+    data = [{"id": test_uuid, "full_name": "Alex Gate", "films": []}]
 
-    await es_write_data(test_settings.es_index_movie, generate_films(1))
     await es_write_data(index, data)
     redis_value = await get_from_redis(f"{index}:{test_uuid}")
     assert redis_value is None
@@ -81,16 +92,23 @@ async def test_person_get_by_id(
     assert body == expected_body
     assert redis_value == expected_body
     await es_clearing(index)
-    await es_clearing(test_settings.es_index_movie)
     await redis_clearing()
 
 
 @pytest.mark.asyncio
-async def test_person_films(es_write_data, es_clearing, make_get_request):
+async def test_person_films(
+    es_write_data, es_clearing, make_get_request, redis_clearing, make_flat_ids
+):
     index = test_settings.es_index_person
     test_uuid = str(uuid.uuid4())
-    person_es_data = [{"id": test_uuid, "full_name": "Alex Gate"}]
     uuid_film_list = (str(uuid.uuid4()), str(uuid.uuid4()))
+    person_es_data = [
+        {
+            "id": test_uuid,
+            "full_name": "Alex Gate",
+            "films": [{"id": i, "roles": ["actor", "writer"]} for i in uuid_film_list],
+        }
+    ]
     film_es_data = [
         {
             "id": i,
@@ -115,6 +133,7 @@ async def test_person_films(es_write_data, es_clearing, make_get_request):
         }
         for i in uuid_film_list
     ]
+    film_es_data = [make_flat_ids(film) for film in film_es_data]
 
     await es_write_data(test_settings.es_index_movie, film_es_data)
     await es_write_data(index, person_es_data)
@@ -128,3 +147,67 @@ async def test_person_films(es_write_data, es_clearing, make_get_request):
     finally:
         await es_clearing(index)
         await es_clearing(test_settings.es_index_movie)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_person_search_cursor(
+    es_write_data, es_clearing, walk_cursor, redis_clearing
+):
+    index = test_settings.es_index_person
+    person_es_data = [
+        {"id": str(uuid.uuid4()), "full_name": f"Alex Gate {i}", "films": []}
+        for i in range(5)
+    ]
+
+    try:
+        await es_write_data(index, person_es_data)
+
+        items = await walk_cursor(
+            "persons/search/cursor", {"query": "alex", "page_size": 2}
+        )
+
+        assert sorted(person["uuid"] for person in items) == sorted(
+            person["id"] for person in person_es_data
+        )
+    finally:
+        await es_clearing(index)
+        await redis_clearing()
+
+
+@pytest.mark.asyncio
+async def test_person_films_cursor(
+    es_write_data,
+    es_clearing,
+    walk_cursor,
+    redis_clearing,
+    generate_films,
+    make_flat_ids,
+):
+    index = test_settings.es_index_person
+    test_uuid = str(uuid.uuid4())
+    film_es_data = generate_films(5)
+    for film in film_es_data:
+        film["actors"].append({"id": test_uuid, "name": "Alex Gate"})
+        make_flat_ids(film)
+    person_es_data = [
+        {
+            "id": test_uuid,
+            "full_name": "Alex Gate",
+            "films": [{"id": film["id"], "roles": ["actor"]} for film in film_es_data],
+        }
+    ]
+
+    try:
+        await es_write_data(test_settings.es_index_movie, film_es_data)
+        await es_write_data(index, person_es_data)
+
+        items = await walk_cursor(f"persons/{test_uuid}/film/cursor", {"page_size": 2})
+
+        assert sorted(film["uuid"] for film in items) == sorted(
+            film["id"] for film in film_es_data
+        )
+    finally:
+        await es_clearing(index)
+        await es_clearing(test_settings.es_index_movie)
+        await redis_clearing()
@@ -74,6 +74,11 @@ SCHEMA_MOVIES = {
                     "name": {"type": "text", "analyzer": "ru_en"},
                 },
             },
+            "genre_ids": {"type": "keyword"},
+            "actor_ids": {"type": "keyword"},
+            "writer_ids": {"type": "keyword"},
+            "director_ids": {"type": "keyword"},
+            "person_ids": {"type": "keyword"},
         },
     },
 }
@@ -113,6 +118,9 @@ SCHEMA_GENRES = {
             "id": {"type": "keyword"},
             "name": {"type": "text", "analyzer": "ru_en"},
             "description": {"type": "text", "analyzer": "ru_en"},
+            "film_count": {"type": "integer"},
+            "avg_rating": {"type": "float"},
+            "top_film_ids": {"type": "keyword"},
         },
     },
 }
@@ -152,6 +160,14 @@ SCHEMA_PERSONS = {
         "properties": {
             "id": {"type": "keyword"},
             "full_name": {"type": "text", "analyzer": "ru_en"},
+            "films": {
+                "type": "object",
+                "dynamic": "strict",
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "roles": {"type": "keyword"},
+                },
+            },
         },
     },
 }
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+SRC_DIR = pathlib.Path(__file__).parent.parent.parent.resolve() / "src"
+sys.path.append(str(SRC_DIR))
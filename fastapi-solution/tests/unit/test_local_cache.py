@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import local_cache
+from services.local_cache import LocalCache, get_local_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время кеша: clock.now сдвигается тестом."""
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(
+        local_cache, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    return clock
+
+
+def test_evicts_least_recently_used_by_entries(clock):
+    cache = LocalCache(max_entries=2, max_bytes=100, ttl=60)
+    cache.set("a", "A", 1)
+    cache.set("b", "B", 1)
+    cache.get("a")
+
+    cache.set("c", "C", 1)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.stats()["entries"] == 2
+    assert cache.evictions == 1
+
+
+def test_evicts_least_recently_used_by_bytes(clock):
+    cache = LocalCache(max_entries=10, max_bytes=10, ttl=60)
+    cache.set("a", "A", 4)
+    cache.set("b", "B", 4)
+
+    cache.set("c", "C", 4)
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+
+def test_skips_value_larger_than_limit(clock):
+    cache = LocalCache(max_entries=10, max_bytes=10, ttl=60)
+    cache.set("a", "A", 4)
+
+    cache.set("big", "BIG", 11)
+
+    assert cache.get("big") is None
+    assert cache.get("a") == "A"
+    assert cache.evictions == 0
+
+
+def test_overwrite_replaces_size(clock):
+    cache = LocalCache(max_entries=10, max_bytes=10, ttl=60)
+    cache.set("a", "A", 4)
+
+    cache.set("a", "AA", 6)
+
+    assert cache.get("a") == "AA"
+    assert cache.stats()["bytes"] == 6
+    assert cache.stats()["entries"] == 1
+
+
+def test_expires_after_ttl(clock):
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=5)
+    cache.set("a", "A", 4)
+
+    clock.now = 4
+    assert cache.get("a") == "A"
+    clock.now = 6
+    assert cache.get("a") is None
+
+    assert cache.stats() == {
+        "entries": 0,
+        "bytes": 0,
+        "hits": 1,
+        "misses": 1,
+        "expirations": 1,
+        "evictions": 0,
+    }
+
+
+def test_delete_and_clear_release_bytes(clock):
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", "A", 4)
+    cache.set("b", "B", 4)
+
+    cache.delete("a")
+    assert cache.stats()["bytes"] == 4
+    cache.clear()
+
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_get_local_cache_is_shared_by_name(monkeypatch):
+    monkeypatch.setattr(local_cache, "local_caches", {})
+
+    movies = get_local_cache("movies", 10, 100, 60)
+
+    assert get_local_cache("movies", 1, 1, 1) is movies
+    assert get_local_cache("persons", 10, 100, 60) is not movies
+    assert set(local_cache.local_caches) == {"movies", "persons"}
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+class LoadError(Exception):
+    pass
+
+
+class Loader:
+    """Загрузка, которая ждет сигнала и считает свои вызовы."""
+
+    def __init__(self, result=None, error: Exception | None = None) -> None:
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class FakeLock:
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.locks = []
+
+    def lock(self, name: str, **kwargs) -> FakeLock:
+        self.locks.append(name)
+        return FakeLock()
+
+
+async def start(flight: SingleFlight, key: str, load, count: int) -> list:
+    waiters = [asyncio.create_task(flight.do(key, load)) for _ in range(count)]
+    # Все ожидающие успевают встать на общую загрузку
+    await asyncio.sleep(0)
+    return waiters
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    flight = SingleFlight()
+    load = Loader({"id": "film"})
+
+    waiters = await start(flight, "movies:film", load, 10)
+    load.release.set()
+
+    assert await asyncio.gather(*waiters) == [{"id": "film"}] * 10
+    assert load.calls == 1
+    # Завершенная загрузка забыта, следующий промах загружает заново
+    assert await flight.do("movies:film", load) == {"id": "film"}
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_keys_load_separately():
+    flight = SingleFlight()
+    load = Loader({"id": "film"})
+
+    waiters = await start(flight, "movies:film", load, 3)
+    waiters += await start(flight, "movies:other", load, 3)
+    load.release.set()
+    await asyncio.gather(*waiters)
+
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_all_waiters_and_is_forgotten():
+    flight = SingleFlight()
+    load = Loader(error=LoadError("es is down"))
+
+    waiters = await start(flight, "movies:film", load, 5)
+    load.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert load.calls == 1
+    assert all(isinstance(result, LoadError) for result in results)
+    load.error = None
+    load.result = {"id": "film"}
+    assert await flight.do("movies:film", load) == {"id": "film"}
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_keeps_load_for_others():
+    flight = SingleFlight()
+    load = Loader({"id": "film"})
+
+    waiters = await start(flight, "movies:film", load, 3)
+    waiters[0].cancel()
+    load.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [{"id": "film"}] * 2
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_lock_rechecks_cache_before_load():
+    redis = FakeRedis()
+    flight = SingleFlight(redis, lock_enabled=True)
+    load = Loader({"id": "film"})
+
+    async def cached():
+        return {"id": "film", "cached": True}
+
+    result = await flight.do("movies:film", load, cached)
+
+    assert result == {"id": "film", "cached": True}
+    assert redis.locks == ["lock:movies:film"]
+    assert load.calls == 0